@@ -1,104 +1,217 @@
-from flask import Flask, jsonify, request
+from flask import (
+    Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context,
+)
 from flask_cors import CORS
-from models import db, Product, Category, CartItem
+from models import (
+    db, Product, Category, CartItem, Order, PRODUCT_LOAD_OPTIONS, ORDER_LOAD_OPTIONS,
+    ensure_schema,
+)
+from catalog import (
+    read_filters, read_fields, product_listing, featured_products, product_facets,
+    category_list, product_load_options, InvalidCursor, InvalidFields,
+)
+from search import ensure_search_index
+from related import (
+    ensure_related_index, refresh_stale, related_products, related_refresher, TOP_K,
+)
+from cache import response_cache, cached
+from metrics import metrics
+from compression import compression
+from autocomplete import autocomplete
+from database import configure_database, read_only
+from cart import get_cart, add_item, set_quantities, InvalidCartItem
+from checkout import checkout, adjust_stock, CheckoutError, CheckoutBusy, OutOfStock
+from batch import run_batch, InvalidBatch
+from reviews import (
+    add_review, edit_review, delete_review, list_reviews, recompute_aggregates,
+    InvalidReview, ReviewConflict,
+)
+from bulk import import_products, export_products_ndjson, read_csv, read_ndjson, open_text
+import click
 import os
 
-app = Flask(__name__)
-CORS(app)
+# ------------------------------
+# CONFIGURATION
+# ------------------------------
+def env_config():
+    """Settings read from the environment; create_app applies them."""
+    config = {
+        # Database
+        "SQLALCHEMY_DATABASE_URI": os.environ.get("DATABASE_URL", "sqlite:///quickcart.db"),
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        # Reads for GET requests use a separate pool, optionally on a replica
+        "READ_DATABASE_URL": os.environ.get("READ_DATABASE_URL"),
+        "SEPARATE_READ_POOL": os.environ.get("SEPARATE_READ_POOL", "1") == "1",
+        "DB_POOL_SIZE": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "READ_POOL_SIZE": int(os.environ.get("READ_POOL_SIZE", 10)),
+        # SQLite tuning, applied to every new connection
+        "SQLITE_JOURNAL_MODE": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+        "SQLITE_SYNCHRONOUS": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "SQLITE_BUSY_TIMEOUT_MS": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        "SQLITE_CACHE_SIZE_KB": int(os.environ.get("SQLITE_CACHE_SIZE_KB", 65536)),
+        "SQLITE_MMAP_SIZE": int(os.environ.get("SQLITE_MMAP_SIZE", 268435456)),
+        # Response cache
+        "CACHE_MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", 512)),
+        "CACHE_TTL": int(os.environ.get("CACHE_TTL", 300)),
+        # Metrics
+        "METRICS_ENABLED": os.environ.get("METRICS_ENABLED", "1") == "1",
+        # Compression; COMPRESS_MIN_SIZE=0 disables it
+        "COMPRESS_MIN_SIZE": int(os.environ.get("COMPRESS_MIN_SIZE", 1024)),
+        "COMPRESS_LEVEL": int(os.environ.get("COMPRESS_LEVEL", 6)),
+        # Autocomplete
+        "AUTOCOMPLETE_LIMIT": int(os.environ.get("AUTOCOMPLETE_LIMIT", 8)),
+        "AUTOCOMPLETE_REBUILD_SECONDS": int(os.environ.get("AUTOCOMPLETE_REBUILD_SECONDS", 300)),
+        # Related products; 0 leaves the stale queue to refresh-related
+        "RELATED_REFRESH_SECONDS": int(os.environ.get("RELATED_REFRESH_SECONDS", 10)),
+        # Startup: schema/trigger checks and optional cache warm-up
+        "SCHEMA_CHECKS": os.environ.get("SCHEMA_CHECKS", "1") == "1",
+        "WARM_CACHE": os.environ.get("WARM_CACHE", "0") == "1",
+    }
+    if os.environ.get("SLOW_QUERY_MS"):
+        config["SLOW_QUERY_MS"] = float(os.environ["SLOW_QUERY_MS"])
+    return config
 
 # ------------------------------
-# DATABASE CONFIGURATION
+# APP FACTORY
 # ------------------------------
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
-    "DATABASE_URL", "sqlite:///quickcart.db"
-)
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-db.init_app(app)
+# create_app() does all the per-process work: configuration, extensions,
+# the schema/index checks and the optional warm-up. Under gunicorn with
+# preload_app (see gunicorn.conf.py) it runs once in the master and the
+# workers are forked from the finished app, so a new worker only has to
+# open its database connections. Connections opened while booting are
+# closed before returning so no worker inherits a shared SQLite handle.
+api = Blueprint("api", __name__, cli_group=None)
+
+# Read at boot when WARM_CACHE=1 so the first visitors hit a warm cache
+WARM_PATHS = ("/api/categories", "/api/featured-products")
+
+def create_app(config=None):
+    """Build the application; ``config`` overrides the environment settings."""
+    app = Flask(__name__)
+    CORS(app)
+    app.config.update(env_config())
+    app.config.update(config or {})
+
+    configure_database(app, db)
+    response_cache.init_app(app)
+    metrics.init_app(app)
+    # Registered after metrics so the recorded response bytes are the
+    # compressed ones
+    compression.init_app(app)
+    autocomplete.init_app(app)
+    related_refresher.init_app(app)
+    app.register_blueprint(api)
+
+    with app.app_context():
+        if app.config["SCHEMA_CHECKS"]:
+            prepare_database()
+        if app.config["WARM_CACHE"]:
+            warm_up(app)
+        for engine in db.engines.values():
+            engine.dispose()
+    return app
+
+def prepare_database():
+    """Bring the schema, search index and related-products triggers up to date."""
+    ensure_schema()
+    ensure_search_index()
+    ensure_related_index()
+
+def warm_up(app):
+    """Prime the response cache and the autocomplete index."""
+    client = app.test_client()
+    for path in WARM_PATHS:
+        client.get(path)
+    autocomplete.build()
+
+def __getattr__(name):
+    # `from app import app`, `flask --app app` and `gunicorn app:app` get a
+    # default app, built on first access rather than at import
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ------------------------------
+# RESPONSE CACHE
+# ------------------------------
+def is_first_page(req):
+    return not req.args.get("cursor") and req.args.get("page", 1, type=int) == 1
+
+# Product attributes maintained by reviews.py, never set through PUT
+REVIEW_AGGREGATES = frozenset({"rating", "base_rating", "rating_sum", "rating_count"})
+
+def invalidate_product_views(featured=False):
+    """Drop cached listings after a product write.
+
+    The featured carousel is only dropped when a featured product changed.
+    """
+    namespaces = ["products", "all-products", "facets"]
+    if featured:
+        namespaces.append("featured")
+    response_cache.invalidate(*namespaces)
 
 # ------------------------------
 # HOME ROUTE
 # ------------------------------
-@app.route("/")
+@api.route("/")
 def home():
     return jsonify({"message": "Welcome to QuickCart API!"})
 
 # ------------------------------
 # FEATURED PRODUCTS
 # ------------------------------
-@app.route("/api/featured-products", methods=["GET"])
+@api.route("/api/featured-products", methods=["GET"])
+@cached("featured")
 def get_featured_products():
-    featured = db.session.query(Product).filter(Product.featured == True).all()
-    return jsonify([p.to_dict() for p in featured]), 200
+    try:
+        fields = read_fields(request.args)
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify([p.to_dict(fields) for p in featured_products(fields)]), 200
 
 # Optional route to mark product as featured
-@app.route("/api/products/<int:product_id>/feature", methods=["PUT"])
+@api.route("/api/products/<int:product_id>/feature", methods=["PUT"])
 def mark_product_featured(product_id):
     product = db.session.get(Product, product_id)
     if not product:
         return jsonify({"error": "Product not found"}), 404
+    was_featured = product.featured
     product.featured = True
     db.session.commit()
+    if not was_featured:
+        invalidate_product_views(featured=True)
     return jsonify({"message": f"Product '{product.name}' is now featured."}), 200
 
 # ------------------------------
 # PRODUCTS CRUD
 # ------------------------------
-@app.route("/api/products", methods=["GET"])
+@api.route("/api/products", methods=["GET"])
+@cached("products", when=is_first_page)
 def get_products():
-    query = db.session.query(Product)
-
-    # Filters
-    category = request.args.get("category")
-    min_price = request.args.get("minPrice", type=float)
-    max_price = request.args.get("maxPrice", type=float)
-    min_rating = request.args.get("minRating", type=float)
-    search = request.args.get("search")
-    sort_by = request.args.get("sortBy", "name")
-
-    if category:
-        query = query.join(Category).filter(Category.name.ilike(f"%{category}%"))
-    if min_price is not None:
-        query = query.filter(Product.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Product.price <= max_price)
-    if min_rating is not None:
-        query = query.filter(Product.rating >= min_rating)
-    if search:
-        query = query.filter(Product.name.ilike(f"%{search}%"))
-
-    # Sorting
-    if sort_by == "price-low":
-        query = query.order_by(Product.price.asc())
-    elif sort_by == "price-high":
-        query = query.order_by(Product.price.desc())
-    elif sort_by == "rating":
-        query = query.order_by(Product.rating.desc())
-    else:
-        query = query.order_by(Product.name.asc())
-
-    # Pagination
-    page = request.args.get("page", 1, type=int)
-    limit = request.args.get("limit", 12, type=int)
-    paginated = query.paginate(page=page, per_page=limit, error_out=False)
-
-    products = [p.to_dict() for p in paginated.items]
+    try:
+        return jsonify(product_listing(request.args))
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify({
-        "products": products,
-        "page": page,
-        "total": paginated.total,
-        "pages": paginated.pages,
-        "has_more": paginated.has_next
-    })
+@api.route("/api/products/facets", methods=["GET"])
+@cached("facets")
+def get_product_facets():
+    filters = read_filters(request.args)
+    return jsonify(product_facets(filters))
 
-@app.route("/api/products/<int:product_id>", methods=["GET"])
+@api.route("/api/products/<int:product_id>", methods=["GET"])
 def get_product(product_id):
-    product = db.session.get(Product, product_id)
+    try:
+        fields = read_fields(request.args)
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+    product = db.session.get(Product, product_id, options=product_load_options(fields))
     if not product:
         return jsonify({"error": "Product not found"}), 404
-    return jsonify(product.to_dict())
+    return jsonify(product.to_dict(fields))
 
-@app.route("/api/products", methods=["POST"])
+@api.route("/api/products", methods=["POST"])
 def create_product():
     data = request.get_json()
     new_product = Product(
@@ -109,126 +222,257 @@ def create_product():
         image_url=data.get("image_url"),
         category_id=data.get("category_id"),
         rating=data.get("rating", 0.0),
+        base_rating=data.get("rating", 0.0),
         featured=data.get("featured", False),
     )
     db.session.add(new_product)
     db.session.commit()
+    invalidate_product_views(featured=new_product.featured)
+    autocomplete.put_product(new_product)
     return jsonify(new_product.to_dict()), 201
 
-@app.route("/api/products/<int:product_id>", methods=["PUT"])
+@api.route("/api/products/<int:product_id>", methods=["PUT"])
 def update_product(product_id):
     product = db.session.get(Product, product_id)
     if not product:
         return jsonify({"error": "Product not found"}), 404
 
     data = request.get_json()
+    derived = sorted(REVIEW_AGGREGATES.intersection(data))
+    if derived:
+        return jsonify({"error": f"Set by reviews, not editable: {', '.join(derived)}"}), 400
+
+    was_featured = product.featured
     for key, value in data.items():
         if hasattr(product, key):
             setattr(product, key, value)
 
     db.session.commit()
+    invalidate_product_views(featured=was_featured or product.featured)
+    autocomplete.put_product(product)
     return jsonify(product.to_dict()), 200
 
-@app.route("/api/products/<int:product_id>", methods=["DELETE"])
+@api.route("/api/products/<int:product_id>", methods=["DELETE"])
 def delete_product(product_id):
     product = db.session.get(Product, product_id)
     if not product:
         return jsonify({"error": "Product not found"}), 404
+    was_featured = product.featured
     db.session.delete(product)
     db.session.commit()
+    invalidate_product_views(featured=was_featured)
+    autocomplete.remove_product(product_id)
     return jsonify({"message": "Product deleted"}), 200
 
+@api.route("/api/products/<int:product_id>/stock", methods=["POST"])
+def adjust_product_stock(product_id):
+    """Atomically add to or remove from stock: {"delta": -3}."""
+    delta = request.get_json().get("delta")
+    if isinstance(delta, bool) or not isinstance(delta, int):
+        return jsonify({"error": "delta must be an integer"}), 400
+    if not adjust_stock(product_id, delta):
+        if not db.session.get(Product, product_id):
+            return jsonify({"error": "Product not found"}), 404
+        return jsonify({"error": "Not enough stock"}), 409
+    product = db.session.get(Product, product_id, options=PRODUCT_LOAD_OPTIONS)
+    invalidate_product_views(featured=product.featured)
+    return jsonify(product.to_dict()), 200
+
+# Not response-cached: cart and order writes mark neighbours stale through
+# the related_stale triggers, which a cached copy would never see. The read
+# is a primary-key range scan either way; it serves the stored neighbours
+# and leaves recomputing stale ones to the background refresher.
+@api.route("/api/products/<int:product_id>/related", methods=["GET"])
+def get_related_products(product_id):
+    try:
+        fields = read_fields(request.args)
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+    limit = max(1, min(request.args.get("limit", TOP_K, type=int), TOP_K))
+    related = related_products(product_id, limit, fields)
+    related_refresher.wake()
+    if not related and not db.session.get(Product, product_id):
+        return jsonify({"error": "Product not found"}), 404
+    return jsonify([p.to_dict(fields) for p in related])
+
+@api.route("/api/autocomplete", methods=["GET"])
+def get_autocomplete():
+    """Suggest product and category names for a search box: ?q=mac."""
+    limit = request.args.get("limit", current_app.config["AUTOCOMPLETE_LIMIT"], type=int)
+    return jsonify(autocomplete.suggest(request.args.get("q", ""), max(1, min(limit, 20))))
+
+# ------------------------------
+# REVIEWS
+# ------------------------------
+@api.route("/api/products/<int:product_id>/reviews", methods=["GET"])
+def get_product_reviews(product_id):
+    """Newest-first reviews, paged with ?cursor=<next_cursor>&limit=."""
+    product = db.session.get(Product, product_id)
+    if not product:
+        return jsonify({"error": "Product not found"}), 404
+    return jsonify({
+        "rating": product.rating,
+        "rating_count": product.rating_count,
+        **list_reviews(product_id, request.args),
+    })
+
+@api.route("/api/products/<int:product_id>/reviews", methods=["POST"])
+def create_review(product_id):
+    data = request.get_json()
+    try:
+        review = add_review(product_id, data.get("user_id"), data.get("rating"),
+                            data.get("comment"))
+    except InvalidReview as e:
+        return jsonify({"error": str(e)}), 400
+    if review is None:
+        return jsonify({"error": "Product not found"}), 404
+    invalidate_product_views(featured=True)
+    return jsonify(review.to_dict()), 201
+
+@api.route("/api/reviews/<int:review_id>", methods=["PATCH"])
+def update_review(review_id):
+    data = request.get_json()
+    try:
+        review = edit_review(review_id, data.get("rating"), data.get("comment"))
+    except InvalidReview as e:
+        return jsonify({"error": str(e)}), 400
+    except ReviewConflict as e:
+        return jsonify({"error": str(e)}), 409
+    if review is None:
+        return jsonify({"error": "Review not found"}), 404
+    invalidate_product_views(featured=True)
+    return jsonify(review.to_dict()), 200
+
+@api.route("/api/reviews/<int:review_id>", methods=["DELETE"])
+def remove_review(review_id):
+    try:
+        product_id = delete_review(review_id)
+    except ReviewConflict as e:
+        return jsonify({"error": str(e)}), 409
+    if product_id is None:
+        return jsonify({"error": "Review not found"}), 404
+    invalidate_product_views(featured=True)
+    return jsonify({"message": "Review deleted"}), 200
+
 # ------------------------------
 # COMBINED PRODUCTS ROUTE
 # ------------------------------
-@app.route("/api/all-products", methods=["GET"])
+@api.route("/api/all-products", methods=["GET"])
+@cached("all-products", when=is_first_page)
 def get_all_products_combined():
-    featured_products = db.session.query(Product).filter(Product.featured == True).all()
-    featured_list = [p.to_dict() for p in featured_products]
-
-    query = db.session.query(Product)
-
-    # Filters
-    category = request.args.get("category")
-    min_price = request.args.get("minPrice", type=float)
-    max_price = request.args.get("maxPrice", type=float)
-    min_rating = request.args.get("minRating", type=float)
-    search = request.args.get("search")
-    sort_by = request.args.get("sortBy", "name")
-
-    if category:
-        query = query.join(Category).filter(Category.name.ilike(f"%{category}%"))
-    if min_price is not None:
-        query = query.filter(Product.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Product.price <= max_price)
-    if min_rating is not None:
-        query = query.filter(Product.rating >= min_rating)
-    if search:
-        query = query.filter(Product.name.ilike(f"%{search}%"))
-
-    # Sorting
-    if sort_by == "price-low":
-        query = query.order_by(Product.price.asc())
-    elif sort_by == "price-high":
-        query = query.order_by(Product.price.desc())
-    elif sort_by == "rating":
-        query = query.order_by(Product.rating.desc())
-    else:
-        query = query.order_by(Product.name.asc())
-
-    # Pagination
-    page = request.args.get("page", 1, type=int)
-    limit = request.args.get("limit", 12, type=int)
-    paginated = query.paginate(page=page, per_page=limit, error_out=False)
-    shop_list = [p.to_dict() for p in paginated.items]
+    try:
+        fields = read_fields(request.args)
+        listing = product_listing(request.args)
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
+    featured_list = [p.to_dict(fields) for p in featured_products(fields)]
+    shop_list = listing.pop("products")
 
     return jsonify({
         "featured_products": featured_list,
         "all_products": shop_list,
-        "shop_page": page,
-        "shop_total": paginated.total,
-        "shop_pages": paginated.pages,
-        "shop_has_more": paginated.has_next
+        **{f"shop_{key}": value for key, value in listing.items()},
     }), 200
 
+# ------------------------------
+# BATCH ROUTE
+# ------------------------------
+@api.route("/api/batch", methods=["POST"])
+@read_only
+def batch_reads():
+    """Answer several catalog reads in one round trip (see batch.py)."""
+    data = request.get_json(silent=True)
+    try:
+        results = run_batch(data.get("requests") if isinstance(data, dict) else None)
+    except InvalidBatch as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"results": results})
+
+# ------------------------------
+# BULK IMPORT / EXPORT
+# ------------------------------
+@api.route("/api/products/import", methods=["POST"])
+def bulk_import_products():
+    """Upsert products from a CSV or NDJSON request body.
+
+    The format comes from ``?format=csv|ndjson`` or the Content-Type.
+    """
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    stream = open_text(request.stream)
+    rows = read_csv(stream) if fmt == "csv" else read_ndjson(stream)
+    chunk_size = request.args.get("chunkSize", 1000, type=int)
+    report = import_products(rows, chunk_size=max(1, chunk_size))
+
+    invalidate_product_views(featured=True)
+    autocomplete.invalidate()
+    if report["categories_created"]:
+        response_cache.invalidate("categories")
+    return jsonify(report), 200
+
+@api.route("/api/products/export", methods=["GET"])
+def bulk_export_products():
+    return Response(
+        stream_with_context(export_products_ndjson()),
+        mimetype="application/x-ndjson",
+    )
+
 # ------------------------------
 # CATEGORIES CRUD
 # ------------------------------
-@app.route("/api/categories", methods=["GET"])
+@api.route("/api/categories", methods=["GET"])
+@cached("categories")
 def get_categories():
-    categories = db.session.query(Category).all()
-    return jsonify([{"id": c.id, "name": c.name} for c in categories])
+    return jsonify(category_list())
 
-@app.route("/api/categories", methods=["POST"])
+@api.route("/api/categories", methods=["POST"])
 def create_category():
     data = request.get_json()
     new_category = Category(name=data["name"])
     db.session.add(new_category)
     db.session.commit()
+    response_cache.invalidate("categories")
+    autocomplete.put_category(new_category)
     return jsonify({"id": new_category.id, "name": new_category.name}), 201
 
 # ------------------------------
 # CART CRUD
 # ------------------------------
-@app.route("/api/cart", methods=["GET"])
+@api.route("/api/cart", methods=["GET"])
 def get_cart_items():
-    items = db.session.query(CartItem).all()
-    return jsonify([item.to_dict() for item in items])
+    user_id = request.args.get("user_id", type=int)
+    if user_id is None:
+        return jsonify({"error": "user_id is required"}), 400
+    return jsonify(get_cart(user_id))
 
-@app.route("/api/cart", methods=["POST"])
+@api.route("/api/cart", methods=["POST"])
 def add_to_cart():
     data = request.get_json()
-    new_item = CartItem(
-        user_id=data["user_id"],
-        product_id=data["product_id"],
-        quantity=data.get("quantity", 1)
-    )
-    db.session.add(new_item)
-    db.session.commit()
-    return jsonify(new_item.to_dict()), 201
+    try:
+        item = add_item(data.get("user_id"), data.get("product_id"), data.get("quantity", 1))
+    except InvalidCartItem as e:
+        return jsonify({"error": str(e)}), 400
+    if item is None:
+        return jsonify({"error": "Product not found"}), 404
+    return jsonify(item.to_dict()), 201
 
-@app.route("/api/cart/<int:item_id>", methods=["DELETE"])
+@api.route("/api/cart", methods=["PATCH"])
+def update_cart_items():
+    data = request.get_json()
+    user_id = data.get("user_id")
+    if not isinstance(user_id, int):
+        return jsonify({"error": "user_id is required"}), 400
+    try:
+        set_quantities(user_id, data.get("items", []))
+    except InvalidCartItem as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(get_cart(user_id)), 200
+
+@api.route("/api/cart/<int:item_id>", methods=["DELETE"])
 def remove_cart_item(item_id):
     item = db.session.get(CartItem, item_id)
     if not item:
@@ -237,10 +481,98 @@ def remove_cart_item(item_id):
     db.session.commit()
     return jsonify({"message": "Item removed from cart"}), 200
 
+# ------------------------------
+# CHECKOUT / ORDERS
+# ------------------------------
+@api.route("/api/checkout", methods=["POST"])
+def place_order():
+    data = request.get_json()
+    user_id = data.get("user_id")
+    if not isinstance(user_id, int):
+        return jsonify({"error": "user_id is required"}), 400
+    try:
+        order = checkout(user_id)
+    except OutOfStock as e:
+        return jsonify({"error": str(e), "product_ids": e.product_ids}), 409
+    except CheckoutBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except CheckoutError as e:
+        return jsonify({"error": str(e)}), 400
+    invalidate_product_views(featured=True)
+    return jsonify(order.to_dict()), 201
+
+@api.route("/api/orders", methods=["GET"])
+def get_orders():
+    user_id = request.args.get("user_id", type=int)
+    if user_id is None:
+        return jsonify({"error": "user_id is required"}), 400
+    orders = (
+        db.session.query(Order)
+        .options(*ORDER_LOAD_OPTIONS)
+        .filter(Order.user_id == user_id)
+        .order_by(Order.id.desc())
+        .all()
+    )
+    return jsonify([o.to_dict() for o in orders])
+
+@api.route("/api/orders/<int:order_id>", methods=["GET"])
+def get_order(order_id):
+    order = db.session.get(Order, order_id, options=ORDER_LOAD_OPTIONS)
+    if not order:
+        return jsonify({"error": "Order not found"}), 404
+    return jsonify(order.to_dict())
+
+# ------------------------------
+# CLI COMMANDS
+# ------------------------------
+@api.cli.command("rebuild-search-index")
+def rebuild_search_index_command():
+    """Repopulate the product full-text search index."""
+    ensure_search_index(rebuild=True)
+    print("Search index rebuilt.")
+
+@api.cli.command("refresh-related")
+@click.option("--all", "rebuild", is_flag=True, help="Recompute every product.")
+@click.option("--batch-size", default=500, show_default=True)
+def refresh_related_command(rebuild, batch_size):
+    """Recompute the related products of every product queued as stale."""
+    ensure_related_index()
+    count = refresh_stale(batch_size=batch_size, rebuild=rebuild)
+    print(f"Refreshed related products for {count} products.")
+
+@api.cli.command("recompute-ratings")
+def recompute_ratings_command():
+    """Rebuild every product's review aggregates from the reviews table."""
+    count = recompute_aggregates()
+    print(f"Recomputed review aggregates for {count} products.")
+
+@api.cli.command("import-products")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]),
+              help="Defaults to the file extension.")
+@click.option("--chunk-size", default=1000, show_default=True)
+def import_products_command(path, fmt, chunk_size):
+    """Upsert products from a CSV or NDJSON file."""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "ndjson")
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = read_csv(f) if fmt == "csv" else read_ndjson(f)
+        report = import_products(rows, chunk_size=chunk_size)
+    print(f"Inserted {report['inserted']}, updated {report['updated']}, "
+          f"{len(report['errors'])} errors.")
+    for error in report["errors"]:
+        print(f"  {error}")
+
+@api.cli.command("export-products")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+def export_products_command(path):
+    """Write the catalog to an NDJSON file."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(export_products_ndjson())
+    print(f"Exported catalog to {path}.")
+
 # ------------------------------
 # RUN SERVER
 # ------------------------------
 if __name__ == "__main__":
-    with app.app_context():
-        db.create_all()
+    app = create_app({"WARM_CACHE": True})
     app.run(debug=True, port=5001)
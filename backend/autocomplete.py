@@ -0,0 +1,289 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app
+from sqlalchemy import func
+from models import db, Product, Category
+
+# ------------------------------
+# AUTOCOMPLETE
+# ------------------------------
+# Search-as-you-type suggestions are answered from memory. Product and
+# category names are kept as sorted arrays of lower-cased terms, searched
+# with bisect, so a keystroke never reaches the database. A name is indexed
+# from each of its first few words ("apple watch series 9", "watch series
+# 9", ...) so typing any of them matches. Matching products are ranked by
+# rating, categories by how many products they hold.
+#
+# The index is built from one bulk query on first use (or at boot with
+# WARM_CACHE) and the product and category write routes keep it current.
+# Each gunicorn worker holds its own copy, so it is also rebuilt every
+# AUTOCOMPLETE_REBUILD_SECONDS to pick up writes handled by other workers,
+# and after bulk imports. Those rebuilds run on a background thread and swap
+# the new arrays in under the lock; keystrokes keep using the old index
+# meanwhile and never wait for the database.
+MAX_WORD_STARTS = 4
+MAX_TERM_LENGTH = 40
+# Prefixes matching more entries than this have their top results memoized
+# until the next write, so one-letter prefixes stay cheap
+MEMO_THRESHOLD = 200
+_WORD = re.compile(r"\w+")
+_END = chr(0x10FFFF)
+
+
+def normalize(text):
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def terms_for(name):
+    words = normalize(name).split(" ")
+    return {
+        " ".join(words[i:])[:MAX_TERM_LENGTH]
+        for i in range(min(len(words), MAX_WORD_STARTS)) if words[i]
+    }
+
+
+class PrefixIndex:
+    """Sorted (term, id) pairs that can be range-searched by prefix."""
+
+    def __init__(self, pairs=()):
+        pairs = sorted(pairs)
+        self._terms = [term for term, _ in pairs]
+        self._ids = [item_id for _, item_id in pairs]
+
+    def add(self, item_id, terms):
+        for term in terms:
+            i = bisect_left(self._terms, term)
+            self._terms.insert(i, term)
+            self._ids.insert(i, item_id)
+
+    def remove(self, item_id, terms):
+        for term in terms:
+            i = bisect_left(self._terms, term)
+            while i < len(self._terms) and self._terms[i] == term:
+                if self._ids[i] == item_id:
+                    del self._terms[i]
+                    del self._ids[i]
+                    break
+                i += 1
+
+    def match(self, prefix):
+        """Return the ids of every entry starting with ``prefix``."""
+        lo = bisect_left(self._terms, prefix)
+        hi = bisect_left(self._terms, prefix + _END, lo)
+        return self._ids[lo:hi]
+
+    def __len__(self):
+        return len(self._terms)
+
+
+class Autocomplete:
+    """Flask extension: each app gets its own AutocompleteIndex.
+
+    The index lives in ``app.extensions["autocomplete"]`` and these methods
+    act on the current app's, so apps built in one process never share
+    suggestions.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("AUTOCOMPLETE_LIMIT", 8)
+        app.config.setdefault("AUTOCOMPLETE_REBUILD_SECONDS", 300)
+        app.extensions["autocomplete"] = AutocompleteIndex(app)
+
+    @staticmethod
+    def index():
+        return current_app.extensions["autocomplete"]
+
+    def build(self):
+        self.index().build()
+
+    def invalidate(self):
+        self.index().invalidate()
+
+    def put_product(self, product):
+        self.index().put_product(product)
+
+    def remove_product(self, product_id):
+        self.index().remove_product(product_id)
+
+    def put_category(self, category):
+        self.index().put_category(category)
+
+    def suggest(self, text, limit=None):
+        return self.index().suggest(text, limit)
+
+
+class AutocompleteIndex:
+    def __init__(self, app):
+        self.limit = app.config["AUTOCOMPLETE_LIMIT"]
+        self.rebuild_seconds = app.config["AUTOCOMPLETE_REBUILD_SECONDS"]
+        self._app = app
+        self._products = PrefixIndex()
+        self._categories = PrefixIndex()
+        self._product_info = {}  # id -> (name, rating, category_id)
+        self._category_info = {}  # id -> [name, product count]
+        self._memo = {}
+        self._built_at = None
+        # Writes applied while a background rebuild runs, replayed onto the
+        # new index so the swap does not lose them; None when idle
+        self._pending = None
+        self._lock = threading.RLock()
+        self._cold_start = threading.Lock()
+
+    # Building
+    def build(self):
+        """Load every product and category name in one pass."""
+        counts = func.count(Product.id)
+        categories = (
+            db.session.query(Category.id, Category.name, counts)
+            .outerjoin(Product, Product.category_id == Category.id)
+            .group_by(Category.id, Category.name)
+            .all()
+        )
+        products = db.session.query(
+            Product.id, Product.name, Product.rating, Product.category_id
+        ).all()
+
+        product_pairs = [(t, pid) for pid, name, _, _ in products for t in terms_for(name)]
+        category_pairs = [(t, cid) for cid, name, _ in categories for t in terms_for(name)]
+        product_index = PrefixIndex(product_pairs)
+        category_index = PrefixIndex(category_pairs)
+        with self._lock:
+            self._products = product_index
+            self._categories = category_index
+            self._product_info = {
+                pid: (name, rating or 0.0, category_id)
+                for pid, name, rating, category_id in products
+            }
+            self._category_info = {cid: [name, count] for cid, name, count in categories}
+            # Every write is idempotent, so replaying one the query already
+            # saw is harmless
+            for apply, args in self._pending or ():
+                apply(*args)
+            self._pending = None
+            self._memo.clear()
+            self._built_at = time.monotonic()
+
+    def rebuild_in_background(self):
+        """Rebuild on a thread; the current index serves until it is swapped."""
+        with self._lock:
+            if self._pending is not None:
+                return
+            self._pending = []
+        # Started on demand rather than from a timer, so it also works in
+        # gunicorn workers forked after the master built the index
+        threading.Thread(target=self._rebuild, daemon=True).start()
+
+    def _rebuild(self):
+        with self._app.app_context():
+            try:
+                self.build()
+            except Exception:
+                self._app.logger.exception("Autocomplete rebuild failed")
+                with self._lock:
+                    self._pending = None
+
+    def invalidate(self):
+        """Reload everything, e.g. after a bulk import."""
+        if self._built_at is not None:
+            self.rebuild_in_background()
+
+    def _ensure_built(self):
+        if self._built_at is None:
+            # Cold start: the first suggestions wait for the one-time build
+            with self._cold_start:
+                if self._built_at is None:
+                    self.build()
+        elif self.rebuild_seconds and time.monotonic() - self._built_at > self.rebuild_seconds:
+            self.rebuild_in_background()
+
+    # Incremental updates from the write routes
+    def put_product(self, product):
+        self._write(self._put_product, product.id, product.name, product.rating,
+                    product.category_id)
+
+    def remove_product(self, product_id):
+        self._write(self._remove_product, product_id)
+
+    def put_category(self, category):
+        self._write(self._put_category, category.id, category.name)
+
+    def _write(self, apply, *args):
+        with self._lock:
+            if self._built_at is None:
+                return
+            apply(*args)
+            if self._pending is not None:
+                self._pending.append((apply, args))
+            self._memo.clear()
+
+    def _put_product(self, product_id, name, rating, category_id):
+        self._drop_product(product_id)
+        self._product_info[product_id] = (name, rating or 0.0, category_id)
+        self._products.add(product_id, terms_for(name))
+        self._count(category_id, 1)
+
+    def _remove_product(self, product_id):
+        self._drop_product(product_id)
+
+    def _put_category(self, category_id, name):
+        old = self._category_info.get(category_id)
+        if old is not None:
+            self._categories.remove(category_id, terms_for(old[0]))
+        self._category_info[category_id] = [name, old[1] if old else 0]
+        self._categories.add(category_id, terms_for(name))
+
+    def _drop_product(self, product_id):
+        old = self._product_info.pop(product_id, None)
+        if old is not None:
+            self._products.remove(product_id, terms_for(old[0]))
+            self._count(old[2], -1)
+
+    def _count(self, category_id, delta):
+        entry = self._category_info.get(category_id)
+        if entry is not None:
+            entry[1] += delta
+
+    # Querying
+    def suggest(self, text, limit=None):
+        """Return the best product and category names starting with ``text``."""
+        # Terms are stored cut to MAX_TERM_LENGTH, so longer input is cut too
+        prefix = normalize(text)[:MAX_TERM_LENGTH]
+        limit = limit or self.limit
+        if not prefix:
+            return {"products": [], "categories": []}
+        self._ensure_built()
+
+        with self._lock:
+            key = (prefix, limit)
+            if key in self._memo:
+                return self._memo[key]
+            product_ids = set(self._products.match(prefix))
+            category_ids = set(self._categories.match(prefix))
+            info, categories = self._product_info, self._category_info
+            best = heapq.nsmallest(
+                limit, product_ids, key=lambda pid: (-info[pid][1], info[pid][0], pid)
+            )
+            top_categories = heapq.nsmallest(
+                limit, category_ids,
+                key=lambda cid: (-categories[cid][1], categories[cid][0], cid),
+            )
+            result = {
+                "products": [
+                    {"id": pid, "name": info[pid][0], "rating": info[pid][1]}
+                    for pid in best
+                ],
+                "categories": [
+                    {"id": cid, "name": categories[cid][0], "count": categories[cid][1]}
+                    for cid in top_categories
+                ],
+            }
+            if len(product_ids) + len(category_ids) > MEMO_THRESHOLD:
+                self._memo[key] = result
+            return result
+
+
+autocomplete = Autocomplete()
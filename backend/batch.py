@@ -0,0 +1,114 @@
+from werkzeug.datastructures import ImmutableMultiDict
+from models import db, Product
+from catalog import (
+    category_list, featured_products, product_listing, product_load_options, read_fields,
+    InvalidCursor, InvalidFields,
+)
+from cache import cached_data
+
+# ------------------------------
+# BATCHED READS
+# ------------------------------
+# POST /api/batch answers several catalog reads in one round trip:
+#
+#     {"requests": [
+#         {"type": "featured", "params": {"fields": "name,price,image_url"}},
+#         {"type": "categories"},
+#         {"key": "laptops", "type": "products", "params": {"category": "Laptops"}},
+#         {"key": "p7", "type": "product", "params": {"id": 7}}
+#     ]}
+#
+# Each sub-request takes the query args of the matching GET route and its
+# result is returned as {"status": ..., "body": ...} under its key (the type
+# unless one is given). All sub-requests share the request's session, so the
+# batch checks out a single connection, and identical sub-requests (same
+# type and params) are only run once. Featured products and categories are
+# read through the response cache entries of their GET routes.
+MAX_SUB_REQUESTS = 20
+
+
+class InvalidBatch(ValueError):
+    """Raised when a batch body is not a list of known sub-requests."""
+
+
+def _featured(args):
+    def compute():
+        fields = read_fields(args)
+        return [p.to_dict(fields) for p in featured_products(fields)]
+    return 200, cached_data("featured", "/api/featured-products", args, compute)
+
+
+def _products(args):
+    return 200, product_listing(args)
+
+
+def _categories(args):
+    return 200, cached_data("categories", "/api/categories", args, category_list)
+
+
+def _product(args):
+    product_id = args.get("id", type=int)
+    if product_id is None:
+        return 400, {"error": "id is required"}
+    fields = read_fields(args)
+    product = db.session.get(Product, product_id, options=product_load_options(fields))
+    if not product:
+        return 404, {"error": "Product not found"}
+    return 200, product.to_dict(fields)
+
+
+HANDLERS = {
+    "featured": _featured,
+    "products": _products,
+    "categories": _categories,
+    "product": _product,
+}
+
+
+def _args(params):
+    """Turn a sub-request's params object into query-arg form."""
+    if params is None:
+        params = {}
+    if not isinstance(params, dict):
+        raise InvalidBatch("params must be an object")
+    items = []
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        items.append((name, str(value)))
+    # Sorted, so params given in a different order still deduplicate
+    return ImmutableMultiDict(sorted(items))
+
+
+def run_batch(subrequests):
+    """Run a list of sub-requests and return {key: {"status", "body"}}.
+
+    The whole batch is validated before any sub-request runs.
+    """
+    if not isinstance(subrequests, list) or not subrequests:
+        raise InvalidBatch("requests must be a non-empty list")
+    if len(subrequests) > MAX_SUB_REQUESTS:
+        raise InvalidBatch(f"At most {MAX_SUB_REQUESTS} requests per batch")
+
+    parsed = []
+    for sub in subrequests:
+        if not isinstance(sub, dict) or sub.get("type") not in HANDLERS:
+            raise InvalidBatch(f"type must be one of: {', '.join(HANDLERS)}")
+        key = str(sub.get("key", sub["type"]))
+        if any(key == seen for seen, _, _ in parsed):
+            raise InvalidBatch(f"Duplicate key: {key}")
+        parsed.append((key, sub["type"], _args(sub.get("params"))))
+
+    results, done = {}, {}
+    for key, kind, args in parsed:
+        signature = (kind, tuple(args.items(multi=True)))
+        if signature not in done:
+            try:
+                done[signature] = HANDLERS[kind](args)
+            except (InvalidCursor, InvalidFields) as e:
+                done[signature] = (400, {"error": str(e)})
+        status, body = done[signature]
+        results[key] = {"status": status, "body": body}
+    return results
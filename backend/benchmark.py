@@ -0,0 +1,765 @@
+"""Large-catalog generator and endpoint benchmark for the QuickCart API.
+
+Generate a synthetic catalog into its own database, then drive every route
+through the Flask test client and record latency, throughput, SQL statement
+counts and peak RSS:
+
+    python benchmark.py generate --size 100k --database sqlite:////tmp/bench.db
+    python benchmark.py run --database sqlite:////tmp/bench.db --workers 8 \\
+        --output results.json
+    python benchmark.py compare before.json after.json
+    python benchmark.py stress-checkout --database sqlite:////tmp/bench.db
+    python benchmark.py check-plans --database sqlite:////tmp/bench.db
+    python benchmark.py startup --database sqlite:////tmp/bench.db --workers 4
+
+Results are written as JSON, tagged with the current git commit, so runs from
+different commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_ITERATIONS = 200
+
+
+def load_app(database, cache, **config):
+    """Build the app against the benchmark database.
+
+    create_app's schema checks also bring databases generated by older
+    commits up to the current schema.
+    """
+    from app import create_app
+    config = {"SQLALCHEMY_DATABASE_URI": database, **config}
+    if not cache:
+        config["CACHE_MAX_ENTRIES"] = 0
+    return create_app(config)
+
+
+# ------------------------------
+# DATA GENERATION
+# ------------------------------
+def generate(args):
+    from faker import Faker
+    from werkzeug.security import generate_password_hash
+
+    # The tables are dropped and recreated below, so skip the schema checks
+    app = load_app(args.database, cache=False, SCHEMA_CHECKS=False)
+    from models import db, Category, Product, User, CartItem
+    from search import ensure_search_index
+
+    products = SIZES.get(args.size.lower()) if args.size else args.products
+    if not products:
+        sys.exit(f"Unknown size {args.size!r}; choose from {', '.join(SIZES)}")
+    categories = args.categories or max(10, products // 1000)
+    users = args.users if args.users is not None else max(10, products // 100)
+
+    fake = Faker()
+    Faker.seed(args.seed)
+    rng = random.Random(args.seed)
+    words = list({w.title() for w in fake.words(nb=3000)})
+    sentences = [fake.sentence(nb_words=14) for _ in range(2000)]
+    now = datetime.utcnow()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        engine = db.engine
+        started = time.perf_counter()
+
+        with engine.begin() as conn:
+            conn.execute(Category.__table__.insert(), [
+                {"id": i, "name": f"{rng.choice(words)} {i}"}
+                for i in range(1, categories + 1)
+            ])
+
+        for start in range(0, products, args.batch_size):
+            stop = min(start + args.batch_size, products)
+            rows = [{
+                "id": i,
+                "name": f"{rng.choice(words)} {rng.choice(words)} {i}",
+                "description": " ".join(rng.sample(sentences, 2)),
+                "price": round(rng.lognormvariate(4, 1.2), 2),
+                "stock": rng.randint(0, 500),
+                "image_url": None if args.no_images
+                else f"https://picsum.photos/seed/{i}/800/600",
+                "rating": round(rng.uniform(1, 5), 1),
+                "featured": rng.random() < 0.001,
+                "category_id": rng.randint(1, categories),
+                "created_at": now - timedelta(minutes=rng.randint(0, 525_600)),
+            } for i in range(start + 1, stop + 1)]
+            for row in rows:
+                row["base_rating"] = row["rating"]
+            with engine.begin() as conn:
+                conn.execute(Product.__table__.insert(), rows)
+            print(f"  products {stop}/{products}", end="\r", flush=True)
+        print()
+
+        password_hash = generate_password_hash("password")
+        with engine.begin() as conn:
+            conn.execute(User.__table__.insert(), [
+                {"id": i, "name": f"User {i}", "email": f"user{i}@example.com",
+                 "password_hash": password_hash}
+                for i in range(1, users + 1)
+            ])
+            cart_rows = []
+            for user_id in range(1, users + 1):
+                for product_id in rng.sample(range(1, products + 1), rng.randint(0, 5)):
+                    cart_rows.append({"user_id": user_id, "product_id": product_id,
+                                      "quantity": rng.randint(1, 3)})
+            if cart_rows:
+                conn.execute(CartItem.__table__.insert(), cart_rows)
+
+        ensure_search_index(rebuild=True)
+        elapsed = time.perf_counter() - started
+
+    print(f"Generated {products} products, {categories} categories, "
+          f"{users} users, {len(cart_rows)} cart items in {elapsed:.1f}s")
+
+
+# ------------------------------
+# SCENARIOS
+# ------------------------------
+class Scenario:
+    """One benchmarked request shape.
+
+    ``build(ctx)`` runs untimed before every request and returns the
+    (method, url, json body) to send, so setup work such as creating a row
+    to delete does not count towards the latency. ``headers`` are sent with
+    every request.
+    """
+
+    def __init__(self, name, endpoint, build, iterations=None, headers=None):
+        self.name = name
+        self.endpoint = endpoint
+        self.build = build
+        self.iterations = iterations
+        self.headers = headers
+
+
+class Context:
+    def __init__(self, client, product_ids, category_names, user_ids, rng):
+        self.client = client
+        self.product_ids = product_ids
+        self.category_names = category_names
+        self.user_ids = user_ids
+        self.rng = rng
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def product_id(self):
+        return self.rng.choice(self.product_ids)
+
+    def unique(self):
+        with self._lock:
+            self._counter += 1
+            return f"{os.getpid()}-{time.time_ns()}-{self._counter}"
+
+    def created_product(self):
+        response = self.client.post("/api/products", json={
+            "name": f"Bench {self.unique()}", "price": 9.99, "stock": 10,
+        })
+        return response.get_json()["id"]
+
+    def cart_item(self, user_id=None):
+        response = self.client.post("/api/cart", json={
+            "user_id": user_id or self.rng.choice(self.user_ids),
+            "product_id": self.product_id(),
+        })
+        return response.get_json()["id"]
+
+    def review(self):
+        response = self.client.post(
+            f"/api/products/{self.created_product()}/reviews",
+            json={"user_id": self.rng.choice(self.user_ids), "rating": 4},
+        )
+        return response.get_json()["id"]
+
+    def order(self):
+        user_id = self.rng.choice(self.user_ids)
+        self.cart_item(user_id)
+        response = self.client.post("/api/checkout", json={"user_id": user_id})
+        return response.get_json().get("id", 0)
+
+
+def _checkout(ctx):
+    user_id = ctx.rng.choice(ctx.user_ids)
+    ctx.cart_item(user_id)
+    return "POST", "/api/checkout", {"user_id": user_id}
+
+
+def _deep_page(ctx):
+    pages = max(1, len(ctx.product_ids) // 12)
+    return "GET", f"/api/products?page={ctx.rng.randint(pages // 2, pages)}", None
+
+
+def _import_body(ctx):
+    lines = "\n".join(json.dumps({
+        "name": f"Import {ctx.unique()}", "price": 5, "category": ctx.category_names[0],
+    }) for _ in range(100))
+    return "POST", "/api/products/import?format=ndjson", lines
+
+
+SCENARIOS = [
+    Scenario("home", "home", lambda ctx: ("GET", "/", None)),
+    Scenario("featured", "get_featured_products",
+             lambda ctx: ("GET", "/api/featured-products", None)),
+    Scenario("products:first-page", "get_products",
+             lambda ctx: ("GET", "/api/products", None)),
+    Scenario("products:deep-offset", "get_products", _deep_page),
+    Scenario("products:cards", "get_products", lambda ctx: (
+        "GET", "/api/products?cursor=&limit=48&fields=name,price,image_url,stock", None,
+    )),
+    Scenario("products:gzip", "get_products",
+             lambda ctx: ("GET", "/api/products?cursor=&limit=48", None),
+             headers={"Accept-Encoding": "gzip"}),
+    Scenario("products:cursor", "get_products",
+             lambda ctx: ("GET", "/api/products?cursor=&sortBy=price-low", None)),
+    Scenario("products:filtered", "get_products", lambda ctx: (
+        "GET",
+        f"/api/products?category={ctx.rng.choice(ctx.category_names)}"
+        "&minPrice=20&maxPrice=200&minRating=3&sortBy=rating",
+        None,
+    )),
+    Scenario("products:search", "get_products", lambda ctx: (
+        "GET", f"/api/products?search={ctx.rng.choice(ctx.category_names)[:4]}", None,
+    )),
+    Scenario("autocomplete", "get_autocomplete", lambda ctx: (
+        "GET", f"/api/autocomplete?q={ctx.rng.choice(ctx.category_names)[:3]}", None,
+    )),
+    Scenario("facets", "get_product_facets",
+             lambda ctx: ("GET", "/api/products/facets?minRating=2", None)),
+    Scenario("product", "get_product",
+             lambda ctx: ("GET", f"/api/products/{ctx.product_id()}", None)),
+    Scenario("related", "get_related_products",
+             lambda ctx: ("GET", f"/api/products/{ctx.product_id()}/related", None)),
+    Scenario("reviews", "get_product_reviews", lambda ctx: (
+        "GET", f"/api/products/{ctx.product_id()}/reviews", None,
+    )),
+    Scenario("review:create", "create_review", lambda ctx: (
+        "POST", f"/api/products/{ctx.product_id()}/reviews",
+        {"user_id": ctx.rng.choice(ctx.user_ids), "rating": ctx.rng.randint(1, 5),
+         "comment": f"Bench {ctx.unique()}"},
+    )),
+    Scenario("review:update", "update_review", lambda ctx: (
+        "PATCH", f"/api/reviews/{ctx.review()}", {"rating": ctx.rng.randint(1, 5)},
+    )),
+    Scenario("review:delete", "remove_review",
+             lambda ctx: ("DELETE", f"/api/reviews/{ctx.review()}", None)),
+    Scenario("all-products", "get_all_products_combined",
+             lambda ctx: ("GET", "/api/all-products", None)),
+    Scenario("batch:home", "batch_reads", lambda ctx: ("POST", "/api/batch", {"requests": [
+        {"type": "featured", "params": {"fields": "name,description,price,stock,image_url"}},
+        {"type": "categories"},
+    ]})),
+    Scenario("categories", "get_categories",
+             lambda ctx: ("GET", "/api/categories", None)),
+    Scenario("cart", "get_cart_items", lambda ctx: (
+        "GET", f"/api/cart?user_id={ctx.rng.choice(ctx.user_ids)}", None,
+    )),
+    Scenario("product:create", "create_product", lambda ctx: (
+        "POST", "/api/products",
+        {"name": f"Bench {ctx.unique()}", "price": 19.99, "stock": 5},
+    )),
+    Scenario("product:update", "update_product", lambda ctx: (
+        "PUT", f"/api/products/{ctx.product_id()}", {"stock": ctx.rng.randint(0, 99)},
+    )),
+    Scenario("product:feature", "mark_product_featured",
+             lambda ctx: ("PUT", f"/api/products/{ctx.product_id()}/feature", None)),
+    Scenario("product:delete", "delete_product",
+             lambda ctx: ("DELETE", f"/api/products/{ctx.created_product()}", None)),
+    Scenario("category:create", "create_category",
+             lambda ctx: ("POST", "/api/categories", {"name": f"Cat {ctx.unique()}"})),
+    Scenario("cart:add", "add_to_cart", lambda ctx: (
+        "POST", "/api/cart",
+        {"user_id": ctx.rng.choice(ctx.user_ids), "product_id": ctx.product_id()},
+    )),
+    Scenario("cart:batch-update", "update_cart_items", lambda ctx: (
+        "PATCH", "/api/cart",
+        {"user_id": ctx.rng.choice(ctx.user_ids), "items": [
+            {"product_id": ctx.product_id(), "quantity": ctx.rng.randint(0, 3)}
+            for _ in range(3)
+        ]},
+    )),
+    Scenario("cart:remove", "remove_cart_item",
+             lambda ctx: ("DELETE", f"/api/cart/{ctx.cart_item()}", None)),
+    Scenario("product:stock", "adjust_product_stock", lambda ctx: (
+        "POST", f"/api/products/{ctx.product_id()}/stock", {"delta": 1},
+    )),
+    Scenario("checkout", "place_order", _checkout),
+    Scenario("orders", "get_orders", lambda ctx: (
+        "GET", f"/api/orders?user_id={ctx.rng.choice(ctx.user_ids)}", None,
+    )),
+    Scenario("order", "get_order",
+             lambda ctx: ("GET", f"/api/orders/{ctx.order()}", None)),
+    Scenario("metrics", "metrics", lambda ctx: ("GET", "/metrics", None)),
+    Scenario("import:100-rows", "bulk_import_products", _import_body, iterations=20),
+    Scenario("export", "bulk_export_products",
+             lambda ctx: ("GET", "/api/products/export", None), iterations=3),
+]
+
+
+# ------------------------------
+# RUNNER
+# ------------------------------
+class StatementCounter:
+    """Counts SQL statements issued by the current thread."""
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+        self._local = threading.local()
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self._local.count = getattr(self._local, "count", 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, "count", 0)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(app, scenario, counter, iterations, workers, seed, ids):
+    def worker(worker_index, count):
+        ctx = Context(app.test_client(), *ids, random.Random(seed + worker_index))
+        samples = []
+        for _ in range(count):
+            method, url, body = scenario.build(ctx)
+            kwargs = {"json": body} if isinstance(body, dict) else {"data": body}
+            counter.reset()
+            started = time.perf_counter()
+            response = ctx.client.open(url, method=method, headers=scenario.headers,
+                                       **kwargs)
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            samples.append((elapsed, counter.count, response.status_code,
+                            len(response.get_data())))
+        return samples
+
+    shares = [iterations // workers + (i < iterations % workers) for i in range(workers)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(worker, range(workers), shares))
+    wall = time.perf_counter() - started
+
+    samples = [s for result in results for s in result]
+    latencies = sorted(s[0] * 1000 for s in samples)
+    return {
+        "endpoint": scenario.endpoint,
+        "requests": len(samples),
+        "workers": workers,
+        "errors": sum(1 for s in samples if s[2] >= 400),
+        "throughput_rps": round(len(samples) / wall, 1) if wall else None,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3),
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "sql_statements_mean": round(statistics.fmean(s[1] for s in samples), 2),
+        "response_bytes_mean": round(statistics.fmean(s[3] for s in samples)),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    app = load_app(args.database, cache=args.cache)
+    from models import db, Product, Category, User
+
+    with app.app_context():
+        ids = (
+            [row[0] for row in db.session.query(Product.id).limit(50_000)],
+            [row[0] for row in db.session.query(Category.name)],
+            [row[0] for row in db.session.query(User.id)],
+        )
+        product_count = db.session.query(Product).count()
+        counter = StatementCounter(db.engines.values())
+    if not ids[0] or not ids[1] or not ids[2]:
+        sys.exit("The benchmark database is empty; run 'generate' first.")
+
+    selected = [s for s in SCENARIOS if not args.only or s.name in args.only]
+    covered = {s.endpoint for s in SCENARIOS}
+    # Routes live on the "api" blueprint; scenarios use the bare view names
+    uncovered = sorted(
+        name for name in (
+            rule.endpoint.rpartition(".")[2] for rule in app.url_map.iter_rules()
+        )
+        if name != "static" and name not in covered
+    )
+    if uncovered:
+        print(f"warning: routes without a scenario: {', '.join(uncovered)}")
+
+    results = {}
+    for workers in args.workers:
+        for scenario in selected:
+            iterations = scenario.iterations or args.iterations
+            stats = run_scenario(app, scenario, counter, iterations, workers,
+                                 args.seed, ids)
+            results[f"{scenario.name}@{workers}"] = stats
+            print(f"{scenario.name:<22} x{workers:<3} "
+                  f"p50 {stats['latency_ms']['p50']:>8.2f}ms  "
+                  f"p95 {stats['latency_ms']['p95']:>8.2f}ms  "
+                  f"p99 {stats['latency_ms']['p99']:>8.2f}ms  "
+                  f"{stats['throughput_rps']:>8.1f} req/s  "
+                  f"{stats['sql_statements_mean']:>5.1f} sql  "
+                  f"{stats['errors']} err")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "database": args.database,
+        "products": product_count,
+        "cache": args.cache,
+        "uncovered_routes": uncovered,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        before = json.load(f)
+    with open(args.candidate) as f:
+        after = json.load(f)
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    regressions = 0
+    for key, new in after["scenarios"].items():
+        old = before["scenarios"].get(key)
+        if old is None:
+            continue
+        old_p95, new_p95 = old["latency_ms"]["p95"], new["latency_ms"]["p95"]
+        change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key:<28} p95 {old_p95:>8.2f} -> {new_p95:>8.2f}ms ({change:+6.1f}%)  "
+              f"sql {old['sql_statements_mean']} -> {new['sql_statements_mean']}{flag}")
+    sys.exit(1 if regressions else 0)
+
+
+# ------------------------------
+# CHECKOUT STRESS TEST
+# ------------------------------
+def stress_checkout(args):
+    """Hammer one product from many threads and check stock stays consistent.
+
+    Every thread repeatedly adds the product to its own cart and checks out
+    until it gets 409 Out Of Stock. Afterwards the remaining stock must be
+    non-negative and equal to the starting stock minus everything ordered.
+    """
+    app = load_app(args.database, cache=True)
+    from sqlalchemy import func
+    from models import db, Product, User, OrderItem
+
+    tag = time.time_ns()
+    with app.app_context():
+        product = Product(name=f"Stress SKU {tag}", price=1.0, stock=args.stock)
+        users = [
+            User(name=f"Stress {i}", email=f"stress-{tag}-{i}@example.com",
+                 password_hash="!")
+            for i in range(args.threads)
+        ]
+        db.session.add(product)
+        db.session.add_all(users)
+        db.session.commit()
+        product_id, user_ids = product.id, [u.id for u in users]
+
+    def buyer(user_id):
+        client = app.test_client()
+        outcomes = Counter()
+        while True:
+            client.post("/api/cart", json={
+                "user_id": user_id, "product_id": product_id, "quantity": args.quantity,
+            })
+            status = client.post("/api/checkout", json={"user_id": user_id}).status_code
+            outcomes[status] += 1
+            if status == 409:
+                return outcomes
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        outcomes = sum(pool.map(buyer, user_ids), Counter())
+    wall = time.perf_counter() - started
+
+    with app.app_context():
+        remaining = db.session.get(Product, product_id).stock
+        sold = db.session.query(
+            func.coalesce(func.sum(OrderItem.quantity), 0)
+        ).filter(OrderItem.product_id == product_id).scalar()
+
+    consistent = remaining >= 0 and sold + remaining == args.stock
+    print(f"{args.threads} threads, {outcomes[201]} orders in {wall:.2f}s "
+          f"({outcomes[201] / wall:.1f} checkouts/s)")
+    print(f"responses: {dict(sorted(outcomes.items()))}")
+    print(f"stock {args.stock} -> {remaining}, sold {sold}: "
+          f"{'consistent' if consistent else 'INCONSISTENT'}")
+    sys.exit(0 if consistent else 1)
+
+
+# ------------------------------
+# QUERY PLAN CHECK
+# ------------------------------
+# The checks live in tests/test_query_plans.py, where the test suite runs
+# them on a small catalog; this runs them on a generated one.
+def check_plans(args):
+    """EXPLAIN every listing, cart, order and review query; fail on a regression."""
+    app = load_app(args.database, cache=False)
+    from models import db
+    from tests.test_query_plans import query_plans
+
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            sys.exit("check-plans reads SQLite's EXPLAIN QUERY PLAN output.")
+    try:
+        results = list(query_plans(app))
+    except ValueError:
+        sys.exit("The database has no categories; run 'generate' first.")
+    failures = 0
+    for label, problems in results:
+        failures += bool(problems)
+        print(f"{'FAIL' if problems else 'ok':<5} {label}")
+        for detail in problems:
+            print(f"        {detail}")
+    print(f"{len(results) - failures}/{len(results)} query plans ok")
+    sys.exit(1 if failures else 0)
+
+
+# ------------------------------
+# STARTUP
+# ------------------------------
+# Runs in a fresh interpreter: times importing app.py, create_app() and the
+# first request, and prints them as one JSON line.
+COLD_START = """
+import json, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+application = module.create_app(json.loads(sys.argv[1]))
+created = time.perf_counter()
+status = application.test_client().get(sys.argv[2]).status_code
+done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_response_ms": (done - created) * 1000,
+    "status": status,
+    "finished_at": time.monotonic(),
+}))
+"""
+
+
+def cold_start(args, config):
+    """Start ``args.workers`` interpreters at once, as gunicorn does without preload."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, *(f"-W{option}" for option in sys.warnoptions),
+               "-c", COLD_START, json.dumps(config), args.path]
+    started = time.monotonic()
+    processes = [
+        subprocess.Popen(command, cwd=here, stdout=subprocess.PIPE, text=True)
+        for _ in range(args.workers)
+    ]
+    workers = []
+    for process in processes:
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            sys.exit("A cold-start worker failed; see the error above.")
+        # Spawn to first response, interpreter startup included; the
+        # monotonic clock is shared by every process on the machine
+        result = json.loads(output.strip().splitlines()[-1])
+        result["process_ms"] = (result.pop("finished_at") - started) * 1000
+        workers.append(result)
+    return workers
+
+
+def preload_start(args, config):
+    """Build the app once, then fork workers from it, as gunicorn's preload_app does."""
+    started = time.perf_counter()
+    import app as module
+    imported = time.perf_counter()
+    application = module.create_app(config)
+    created = time.perf_counter()
+
+    children = []
+    for _ in range(args.workers):
+        read_end, write_end = os.pipe()
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            status = application.test_client().get(args.path).status_code
+            done = time.perf_counter()
+            with os.fdopen(write_end, "w") as out:
+                json.dump({"first_response_ms": (done - forked) * 1000,
+                           "status": status}, out)
+            os._exit(0)
+        os.close(write_end)
+        children.append((pid, read_end))
+
+    workers = []
+    for pid, read_end in children:
+        with os.fdopen(read_end) as pipe:
+            output = pipe.read()
+        os.waitpid(pid, 0)
+        if not output:
+            sys.exit("A forked worker failed; see the error above.")
+        workers.append(json.loads(output))
+    return {
+        "import_ms": (imported - started) * 1000,
+        "create_app_ms": (created - imported) * 1000,
+        "workers": workers,
+    }
+
+
+def _spread(values):
+    values = sorted(values)
+    return f"p50 {percentile(values, 50):>8.1f}ms  max {values[-1]:>8.1f}ms"
+
+
+def startup(args):
+    """Measure import time and time to first response per worker."""
+    config = {"SQLALCHEMY_DATABASE_URI": args.database, "WARM_CACHE": args.warm}
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "database": args.database,
+        "path": args.path,
+        "workers": args.workers,
+        "warm_cache": args.warm,
+    }
+
+    # Cold first: the preload run imports the app into this process
+    if args.mode in ("cold", "both"):
+        workers = report["cold"] = cold_start(args, config)
+        print(f"cold     x{args.workers}")
+        for key in ("import_ms", "create_app_ms", "first_response_ms", "process_ms"):
+            print(f"  {key:<20} {_spread(w[key] for w in workers)}")
+    if args.mode in ("preload", "both"):
+        preload = report["preload"] = preload_start(args, config)
+        print(f"preload  x{args.workers}")
+        print(f"  {'master import_ms':<20} {preload['import_ms']:>8.1f}ms")
+        print(f"  {'master create_app_ms':<20} {preload['create_app_ms']:>8.1f}ms")
+        print(f"  {'first_response_ms':<20} "
+              f"{_spread(w['first_response_ms'] for w in preload['workers'])}")
+
+    statuses = [w["status"] for w in report.get("cold", [])]
+    statuses += [w["status"] for w in report.get("preload", {}).get("workers", [])]
+    if any(status != 200 for status in statuses):
+        print(f"warning: non-200 first responses: {sorted(set(statuses))}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="build a synthetic catalog")
+    gen.add_argument("--database", required=True, help="SQLAlchemy URL to (re)create")
+    gen.add_argument("--size", choices=sorted(SIZES), help="preset catalog size")
+    gen.add_argument("--products", type=int, default=10_000)
+    gen.add_argument("--categories", type=int)
+    gen.add_argument("--users", type=int)
+    gen.add_argument("--no-images", action="store_true",
+                     help="leave image_url empty for an image-free dataset")
+    gen.add_argument("--batch-size", type=int, default=10_000)
+    gen.add_argument("--seed", type=int, default=42)
+    gen.set_defaults(func=generate)
+
+    bench = sub.add_parser("run", help="benchmark every route")
+    bench.add_argument("--database", required=True)
+    bench.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    bench.add_argument("--workers", type=int, nargs="+", default=[1],
+                       help="concurrency levels to run, e.g. --workers 1 8")
+    bench.add_argument("--only", nargs="+", help="scenario names to run")
+    bench.add_argument("--cache", action="store_true",
+                       help="keep the response cache enabled")
+    bench.add_argument("--seed", type=int, default=42)
+    bench.add_argument("--output", help="write results as JSON")
+    bench.set_defaults(func=run)
+
+    cmp_ = sub.add_parser("compare", help="diff two result files")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("candidate")
+    cmp_.add_argument("--threshold", type=float, default=10.0,
+                      help="p95 increase (%%) reported as a regression")
+    cmp_.set_defaults(func=compare)
+
+    stress = sub.add_parser("stress-checkout", help="race checkouts for one product")
+    stress.add_argument("--database", required=True)
+    stress.add_argument("--threads", type=int, default=32)
+    stress.add_argument("--stock", type=int, default=500)
+    stress.add_argument("--quantity", type=int, default=1,
+                        help="units bought per checkout")
+    stress.set_defaults(func=stress_checkout)
+
+    plans = sub.add_parser("check-plans",
+                           help="fail on full scans or temp sorts in query plans")
+    plans.add_argument("--database", required=True)
+    plans.set_defaults(func=check_plans)
+
+    boot = sub.add_parser("startup",
+                          help="time imports and first responses of new workers")
+    boot.add_argument("--database", required=True)
+    boot.add_argument("--workers", type=int, default=4)
+    boot.add_argument("--mode", choices=["cold", "preload", "both"], default="both",
+                      help="fresh interpreters, workers forked from a built app, or both")
+    boot.add_argument("--path", default="/api/products",
+                      help="route requested first by each worker")
+    boot.add_argument("--warm", action="store_true",
+                      help="boot with WARM_CACHE enabled")
+    boot.add_argument("--output", help="write results as JSON")
+    boot.set_defaults(func=startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
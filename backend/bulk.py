@@ -0,0 +1,210 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Product, Category
+
+# ------------------------------
+# BULK IMPORT
+# ------------------------------
+# Rows are upserted by product name, one transaction per chunk. Each chunk
+# does one SELECT to find existing products and then a single executemany
+# for its inserts and another for its updates. Categories are resolved
+# from a map loaded once per import; unknown category names are created.
+# An imported rating is the product's base_rating: it is only shown while
+# the product has no reviews, and never overwrites a review average.
+DEFAULT_CHUNK_SIZE = 1000
+
+FIELD_TYPES = {
+    "name": str,
+    "description": str,
+    "price": float,
+    "stock": int,
+    "image_url": str,
+    "rating": float,
+    "featured": lambda value: value if isinstance(value, bool)
+    else str(value).strip().lower() in ("1", "true", "yes"),
+    "category_id": int,
+}
+INSERT_DEFAULTS = {
+    "description": None,
+    "stock": 0,
+    "image_url": None,
+    "rating": 0.0,
+    "featured": False,
+    "category_id": None,
+}
+EXPORT_COLUMNS = (
+    Product.id, Product.name, Product.description, Product.price, Product.stock,
+    Product.image_url, Product.rating, Product.featured, Category.name.label("category"),
+)
+
+
+def read_csv(stream):
+    """Yield dict rows from a CSV text stream with a header line."""
+    yield from csv.DictReader(stream)
+
+
+def read_ndjson(stream):
+    """Yield dict rows from newline-delimited JSON, skipping blank lines."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Surfaced as a per-row error by import_products
+                yield None
+
+
+def open_text(binary_stream):
+    return io.TextIOWrapper(binary_stream, encoding="utf-8", newline="")
+
+
+def _clean(raw, categories):
+    """Validate and coerce one input row, returning the product values."""
+    if not isinstance(raw, dict):
+        raise ValueError("Row is not an object")
+    values = {}
+    for key, convert in FIELD_TYPES.items():
+        value = raw.get(key)
+        if value is None or value == "":
+            continue
+        try:
+            values[key] = convert(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for {key}: {value!r}")
+
+    category_name = raw.get("category") or ""
+    if not isinstance(category_name, str):
+        raise ValueError(f"Invalid value for category: {category_name!r}")
+    category_name = category_name.strip()
+    if category_name:
+        values["category_id"] = categories.resolve(category_name)
+
+    if not values.get("name"):
+        raise ValueError("Missing name")
+    return values
+
+
+class CategoryMap:
+    """Category name -> id, prefetched once and extended as rows need it."""
+
+    def __init__(self):
+        self.created = []
+        self.reload()
+
+    def reload(self):
+        """Refetch the map, e.g. after a rollback discarded new categories."""
+        self.ids = dict(db.session.execute(select(Category.name, Category.id)).all())
+        self.created = [name for name in self.created if name in self.ids]
+
+    def resolve(self, name):
+        if name not in self.ids:
+            category = Category(name=name)
+            db.session.add(category)
+            db.session.flush()
+            self.ids[name] = category.id
+            self.created.append(name)
+        return self.ids[name]
+
+
+def _upsert_chunk(chunk, categories, report):
+    cleaned = []
+    for row_number, raw in chunk:
+        try:
+            cleaned.append((row_number, _clean(raw, categories)))
+        except ValueError as e:
+            report["errors"].append({"row": row_number, "error": str(e)})
+
+    names = {values["name"] for _, values in cleaned}
+    existing = {}
+    if names:
+        for product_id, name in db.session.execute(
+            select(Product.id, Product.name).where(Product.name.in_(names))
+        ):
+            existing.setdefault(name, []).append(product_id)
+
+    pending, updates = {}, []
+    for row_number, values in cleaned:
+        name = values["name"]
+        if name in existing:
+            updates.extend({**values, "id": pid} for pid in existing[name])
+        elif name in pending:
+            # A repeated name within the chunk updates the pending insert
+            pending[name].update(values)
+        elif "price" not in values:
+            report["errors"].append({"row": row_number, "error": "Missing price"})
+        else:
+            pending[name] = {**INSERT_DEFAULTS, **values}
+    inserts = list(pending.values())
+    for values in inserts:
+        values["base_rating"] = values["rating"]
+    rerated = []
+    for values in updates:
+        if "rating" in values:
+            values["base_rating"] = values.pop("rating")
+            rerated.append(values["id"])
+
+    try:
+        if inserts:
+            db.session.execute(insert(Product), inserts)
+        if updates:
+            db.session.execute(update(Product), updates)
+        if rerated:
+            db.session.execute(
+                update(Product)
+                .where(Product.id.in_(rerated), Product.rating_count == 0)
+                .values(rating=Product.base_rating)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        categories.reload()
+        first, last = chunk[0][0], chunk[-1][0]
+        report["errors"].append({
+            "rows": [first, last],
+            "error": f"Chunk failed: {e.__class__.__name__}",
+        })
+        return
+
+    report["inserted"] += len(inserts)
+    report["updated"] += len(updates)
+
+
+def import_products(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Upsert an iterable of product dicts and return a summary report.
+
+    ``category`` may be given by name (resolved or created) or as
+    ``category_id``. Invalid rows are skipped and listed in
+    ``report["errors"]`` with their 1-based row number.
+    """
+    report = {"inserted": 0, "updated": 0, "errors": [], "categories_created": []}
+    categories = CategoryMap()
+    numbered = enumerate(rows, start=1)
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            break
+        _upsert_chunk(chunk, categories, report)
+    report["categories_created"] = categories.created
+    return report
+
+
+# ------------------------------
+# STREAMING EXPORT
+# ------------------------------
+def export_products_ndjson(batch_size=DEFAULT_CHUNK_SIZE):
+    """Yield the catalog as NDJSON lines, fetching rows in batches."""
+    query = (
+        select(*EXPORT_COLUMNS)
+        .outerjoin(Category, Category.id == Product.category_id)
+        .order_by(Product.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in db.session.execute(query):
+        yield json.dumps(row._asdict()) + "\n"
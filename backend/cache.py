@@ -0,0 +1,219 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from compression import compression, mark_gzipped
+from models import db, CacheVersion
+
+# ------------------------------
+# RESPONSE CACHE
+# ------------------------------
+# A small in-process LRU of rendered catalog responses. Entries are grouped
+# into namespaces ("featured", "products", ...) and the write routes
+# invalidate exactly the namespaces they affect.
+#
+# Each gunicorn worker has its own LRU, so invalidation goes through the
+# database: every namespace has a version row in cache_versions, bumped by
+# invalidate() and read (one primary-key lookup) by every cached request.
+# An entry only serves requests while its namespace is still at the
+# version it was rendered under, so a write handled by one worker is seen
+# by all of them on their next request. The TTL only bounds memory use.
+
+
+class CacheEntry:
+    def __init__(self, body, mimetype, expires_at, version):
+        self.body = body
+        self.mimetype = mimetype
+        self.expires_at = expires_at
+        self.version = version
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        # Compressed on the first hit from a client that accepts gzip
+        self.gzip_body = None
+        # Decoded on the first hit from a batched read
+        self.data = None
+
+    def to_data(self):
+        if self.data is None:
+            self.data = json.loads(self.body)
+        return self.data
+
+    def to_response(self):
+        gzipped = compression.wants_gzip(self.body, self.mimetype)
+        if gzipped and self.gzip_body is None:
+            self.gzip_body = compression.compress(self.body)
+        body = self.gzip_body if gzipped else self.body
+        response = current_app.response_class(body, mimetype=self.mimetype)
+        response.set_etag(self.etag)
+        if gzipped:
+            mark_gzipped(response)
+        response.last_modified = self.last_modified
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+
+class ResponseCache:
+    """Each app gets its own LRU, kept in ``app.extensions["response_cache"]``;
+    these methods act on the current app's."""
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_MAX_ENTRIES", self.max_entries)
+        app.config.setdefault("CACHE_TTL", self.ttl)
+        app.extensions["response_cache"] = _Entries()
+
+    @staticmethod
+    def _entries():
+        return current_app.extensions["response_cache"]
+
+    @property
+    def enabled(self):
+        return current_app.config["CACHE_MAX_ENTRIES"] > 0
+
+    def version(self, namespace):
+        """The namespace's current shared version."""
+        return db.session.execute(
+            select(CacheVersion.version).where(CacheVersion.namespace == namespace)
+        ).scalar() or 0
+
+    def get(self, key, version):
+        """Return the entry for ``key`` if it was rendered at ``version``."""
+        entries = self._entries()
+        with entries.lock:
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != version or entry.expires_at <= time.monotonic():
+                del entries[key]
+                return None
+            entries.move_to_end(key)
+            return entry
+
+    def set(self, key, response, version):
+        """Store a response rendered while the namespace was at ``version``.
+
+        ``version`` must be read before rendering: if the namespace is
+        bumped meanwhile, the entry is simply never served.
+        """
+        config = current_app.config
+        entry = CacheEntry(
+            response.get_data(), response.mimetype,
+            time.monotonic() + config["CACHE_TTL"], version,
+        )
+        entries = self._entries()
+        with entries.lock:
+            entries[key] = entry
+            entries.move_to_end(key)
+            while len(entries) > config["CACHE_MAX_ENTRIES"]:
+                entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *namespaces):
+        """Bump the namespaces' shared versions, for every worker."""
+        try:
+            self._bump(namespaces)
+        except IntegrityError:
+            # Another worker created a missing version row first
+            self._bump(namespaces)
+        entries = self._entries()
+        with entries.lock:
+            for key in [k for k in entries if k[0] in namespaces]:
+                del entries[key]
+
+    def _bump(self, namespaces):
+        table = CacheVersion.__table__
+        namespaces = set(namespaces)
+        with db.engine.begin() as conn:
+            bumped = conn.execute(
+                update(table)
+                .where(table.c.namespace.in_(namespaces))
+                .values(version=table.c.version + 1)
+            )
+            if bumped.rowcount < len(namespaces):
+                existing = set(conn.scalars(
+                    select(table.c.namespace).where(table.c.namespace.in_(namespaces))
+                ))
+                conn.execute(insert(table), [
+                    {"namespace": namespace, "version": 1}
+                    for namespace in sorted(namespaces - existing)
+                ])
+
+    def clear(self):
+        entries = self._entries()
+        with entries.lock:
+            entries.clear()
+
+
+class _Entries(OrderedDict):
+    """One app's cached responses, least recently used first."""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+
+response_cache = ResponseCache()
+
+
+def cache_key(namespace, path=None, args=None):
+    """Build a key from the namespace, path and normalized query args.
+
+    ``path`` and ``args`` default to the current request's.
+    """
+    if path is None:
+        path, args = request.path, request.args
+    return (namespace, path, tuple(sorted(args.items(multi=True))))
+
+
+def cached_data(namespace, path, args, compute):
+    """Return ``compute()`` through the cache entry of GET ``path?args``.
+
+    Lets batched reads share entries with the routes they stand in for:
+    a miss stores the rendered result, a hit returns the decoded body.
+    """
+    if not response_cache.enabled:
+        return compute()
+    key = cache_key(namespace, path, args)
+    version = response_cache.version(namespace)
+    entry = response_cache.get(key, version)
+    if entry is None:
+        data = compute()
+        entry = response_cache.set(key, current_app.json.response(data), version)
+    return entry.to_data()
+
+
+def cached(namespace, when=None):
+    """Serve a GET view from the response cache.
+
+    ``when`` is an optional predicate on the request. Requests it rejects
+    bypass the cache, e.g. deep pages that are rarely repeated. Cached
+    responses carry ETag/Last-Modified and answer conditional requests
+    with 304 Not Modified.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not response_cache.enabled or (when is not None and not when(request)):
+                return view(*args, **kwargs)
+
+            key = cache_key(namespace)
+            version = response_cache.version(namespace)
+            entry = response_cache.get(key, version)
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = response_cache.set(key, response, version)
+            return entry.to_response()
+        return wrapper
+    return decorator
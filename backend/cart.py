@@ -0,0 +1,129 @@
+from sqlalchemy import delete, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import contains_eager
+from models import db, Product, CartItem, CART_ITEM_LOAD_OPTIONS
+
+# ------------------------------
+# PER-USER CART
+# ------------------------------
+# Carts are keyed by (user_id, product_id), backed by a unique index. Adds
+# and quantity changes are single INSERT ... ON CONFLICT statements, so two
+# concurrent adds of the same product merge instead of creating two rows.
+# SQLite does not enforce the products foreign key, so rows are only
+# inserted for products that exist.
+
+
+class InvalidCartItem(ValueError):
+    """Raised when a cart request carries an unusable product or quantity."""
+
+
+class UnsupportedDatabase(RuntimeError):
+    """Raised when the configured database has no INSERT ... ON CONFLICT."""
+
+
+def _insert():
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(CartItem)
+    if dialect == "sqlite":
+        return sqlite.insert(CartItem)
+    raise UnsupportedDatabase(
+        f"Carts need SQLite or PostgreSQL, but DATABASE_URL points at {dialect}"
+    )
+
+
+def _quantity(value, allow_zero=False):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise InvalidCartItem("quantity must be an integer")
+    if value < (0 if allow_zero else 1):
+        raise InvalidCartItem("quantity must be positive")
+    return value
+
+
+def get_cart(user_id):
+    """Return a user's cart items with subtotals from one joined query."""
+    subtotal = (CartItem.quantity * Product.price).label("subtotal")
+    rows = (
+        db.session.query(CartItem, subtotal)
+        .join(CartItem.product)
+        .options(contains_eager(CartItem.product).joinedload(Product.category))
+        .filter(CartItem.user_id == user_id)
+        .order_by(CartItem.id)
+        .all()
+    )
+    items = [{**item.to_dict(), "subtotal": round(value, 2)} for item, value in rows]
+    return {
+        "user_id": user_id,
+        "items": items,
+        "count": sum(item["quantity"] for item in items),
+        "total": round(sum(value for _, value in rows), 2),
+    }
+
+
+def add_item(user_id, product_id, quantity=1):
+    """Add a product, incrementing the quantity if it is already in the cart.
+
+    Returns None if the product does not exist.
+    """
+    for name, value in (("user_id", user_id), ("product_id", product_id)):
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise InvalidCartItem(f"{name} must be an integer")
+    quantity = _quantity(quantity)
+    # INSERT ... SELECT FROM products, so an unknown product inserts nothing
+    statement = _insert().from_select(
+        ["user_id", "product_id", "quantity"],
+        select(literal(user_id), Product.id, literal(quantity))
+        .where(Product.id == product_id),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "product_id"],
+        set_={"quantity": CartItem.quantity + statement.excluded.quantity},
+    )
+    if db.session.execute(statement).rowcount == 0:
+        db.session.rollback()
+        return None
+    db.session.commit()
+    return (
+        db.session.query(CartItem)
+        .options(*CART_ITEM_LOAD_OPTIONS)
+        .filter_by(user_id=user_id, product_id=product_id)
+        .one()
+    )
+
+
+def set_quantities(user_id, changes):
+    """Apply a batch of {product_id, quantity} changes in one transaction.
+
+    Positive quantities are upserted with one executemany; a quantity of 0
+    removes the product from the cart.
+    """
+    upserts, removals = [], []
+    for change in changes:
+        if not isinstance(change, dict) or not isinstance(change.get("product_id"), int):
+            raise InvalidCartItem("each item needs an integer product_id")
+        quantity = _quantity(change.get("quantity"), allow_zero=True)
+        if quantity:
+            upserts.append({"user_id": user_id, "product_id": change["product_id"],
+                            "quantity": quantity})
+        else:
+            removals.append(change["product_id"])
+
+    if upserts:
+        wanted = {row["product_id"] for row in upserts}
+        found = set(db.session.scalars(select(Product.id).where(Product.id.in_(wanted))))
+        if wanted - found:
+            missing = ", ".join(str(pid) for pid in sorted(wanted - found))
+            raise InvalidCartItem(f"Unknown product_id: {missing}")
+        statement = _insert()
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "product_id"],
+            set_={"quantity": statement.excluded.quantity},
+        )
+        db.session.execute(statement, upserts)
+    if removals:
+        db.session.execute(
+            delete(CartItem).where(
+                CartItem.user_id == user_id, CartItem.product_id.in_(removals)
+            )
+        )
+    db.session.commit()
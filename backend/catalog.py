@@ -0,0 +1,325 @@
+import base64
+import binascii
+import json
+
+from sqlalchemy import and_, or_, func, case, cast, Integer
+from sqlalchemy.orm import joinedload, load_only
+from models import db, Product, Category, PRODUCT_FIELDS, PRODUCT_LOAD_OPTIONS, RATING_KEY
+from search import apply_search
+
+# ------------------------------
+# SORT OPTIONS
+# ------------------------------
+# Every sortBy value maps to a (key expression, direction) pair. Product.id is
+# always appended as a tiebreaker so the ordering is total, which is what lets
+# a cursor point at an exact position in the listing. "relevance" is only
+# available alongside a full-text search and is resolved per query.
+SORT_OPTIONS = {
+    "name": (Product.name, "asc"),
+    "price-low": (Product.price, "asc"),
+    "price-high": (Product.price, "desc"),
+    "rating": (RATING_KEY, "desc"),
+}
+DEFAULT_SORT = "name"
+RELEVANCE = "relevance"
+DEFAULT_PAGE_SIZE = 12
+MAX_PAGE_SIZE = 100
+
+# Upper bounds of the price histogram buckets; the last bucket is open-ended
+PRICE_BUCKETS = (25, 50, 100, 250, 500, 1000, 2500)
+RATING_LEVELS = (1, 2, 3, 4, 5)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded for this listing."""
+
+
+class InvalidFields(ValueError):
+    """Raised when ?fields= names something that is not a product field."""
+
+
+# ------------------------------
+# SPARSE FIELDSETS
+# ------------------------------
+# ?fields=name,price,image_url limits a product response to those fields
+# (id is always included). Only the matching columns are selected, and the
+# category join is skipped unless "category" is asked for.
+def read_fields(args):
+    """Return the requested product fields, or None for all of them."""
+    raw = args.get("fields")
+    if not raw:
+        return None
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = requested - set(PRODUCT_FIELDS)
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return tuple(name for name in PRODUCT_FIELDS if name in requested)
+
+
+def product_load_options(fields):
+    """Loader options that select only the columns ``fields`` needs."""
+    if fields is None:
+        return PRODUCT_LOAD_OPTIONS
+    columns = [getattr(Product, name) for name in fields if name != "category"]
+    options = [load_only(*columns)]
+    if "category" in fields:
+        options.append(joinedload(Product.category))
+    return tuple(options)
+
+
+# ------------------------------
+# FILTERS
+# ------------------------------
+def read_filters(args):
+    """Pull the listing filters out of a request's query args."""
+    search = args.get("search")
+    sort_by = args.get("sortBy", RELEVANCE if search else DEFAULT_SORT)
+    if sort_by not in SORT_OPTIONS and sort_by != RELEVANCE:
+        sort_by = DEFAULT_SORT
+    return {
+        "category": args.get("category"),
+        "min_price": args.get("minPrice", type=float),
+        "max_price": args.get("maxPrice", type=float),
+        "min_rating": args.get("minRating", type=float),
+        "search": search,
+        "sort_by": sort_by,
+    }
+
+
+def build_product_query(filters, fields=None):
+    """Return an unordered Product query with all listing filters applied.
+
+    Also returns the search rank expression (None without a full-text
+    search), which the relevance sort orders by. ``fields`` limits the
+    selected columns (see read_fields).
+    """
+    query = db.session.query(Product).options(*product_load_options(fields))
+    return apply_filters(query, filters)
+
+
+def apply_filters(query, filters):
+    """Apply the listing filters to any query selecting from products."""
+    rank = None
+
+    if filters["category"]:
+        # Resolve the (small) categories table first so products can be
+        # filtered on category_id without a join. A single match becomes an
+        # equality, which the (category_id, sort key) indexes serve in order.
+        category_ids = [cid for (cid,) in db.session.query(Category.id).filter(
+            Category.name.ilike(f"%{filters['category']}%")
+        )]
+        if len(category_ids) == 1:
+            query = query.filter(Product.category_id == category_ids[0])
+        else:
+            query = query.filter(Product.category_id.in_(category_ids))
+    if filters["min_price"] is not None:
+        query = query.filter(Product.price >= filters["min_price"])
+    if filters["max_price"] is not None:
+        query = query.filter(Product.price <= filters["max_price"])
+    if filters["min_rating"] is not None:
+        query = query.filter(RATING_KEY >= filters["min_rating"])
+    if filters["search"]:
+        query, rank = apply_search(query, filters["search"])
+
+    return query, rank
+
+
+def sort_key(sort_by, rank):
+    """Return the (key expression, direction) a listing is ordered by."""
+    if sort_by == RELEVANCE:
+        # bm25 scores are lower for better matches
+        return (rank, "asc") if rank is not None else SORT_OPTIONS[DEFAULT_SORT]
+    return SORT_OPTIONS[sort_by]
+
+
+def apply_sort(query, key, direction):
+    if direction == "desc":
+        return query.order_by(key.desc(), Product.id.desc())
+    return query.order_by(key.asc(), Product.id.asc())
+
+
+# ------------------------------
+# CURSORS
+# ------------------------------
+def encode_cursor(sort_by, key, product_id):
+    payload = json.dumps([sort_by, key, product_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort_by):
+    """Decode a cursor, checking it was issued for the same sort order."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        cursor_sort, key, product_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if cursor_sort != sort_by:
+        raise InvalidCursor("Cursor does not match sortBy")
+    # Only scalars a sort key can hold may reach the query as parameters
+    if (
+        isinstance(key, bool) or not isinstance(key, (str, int, float))
+        or isinstance(product_id, bool) or not isinstance(product_id, int)
+    ):
+        raise InvalidCursor("Malformed cursor")
+    return key, product_id
+
+
+def _seek(query, column, direction, key, product_id):
+    if direction == "desc":
+        return query.filter(or_(
+            column < key, and_(column == key, Product.id < product_id)
+        ))
+    return query.filter(or_(
+        column > key, and_(column == key, Product.id > product_id)
+    ))
+
+
+# ------------------------------
+# PAGINATION
+# ------------------------------
+def paginate_products(filters, args, fields=None):
+    """Run a listing query and return (products, pagination metadata).
+
+    Passing a ``cursor`` arg (empty for the first page) switches to keyset
+    pagination: rows are fetched with ``WHERE (key, id) > last`` instead of
+    OFFSET, and the COUNT(*) is skipped unless ``withTotal=true`` is passed,
+    so a deep page costs the same as the first one. Without ``cursor`` the
+    classic page/limit contract is used.
+    """
+    query, rank = build_product_query(filters, fields)
+    sort_by = filters["sort_by"]
+    column, direction = sort_key(sort_by, rank)
+    limit = args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+
+    if "cursor" not in args:
+        page = args.get("page", 1, type=int)
+        paginated = apply_sort(query, column, direction).paginate(
+            page=page, per_page=limit, error_out=False
+        )
+        return paginated.items, {
+            "page": page,
+            "total": paginated.total,
+            "pages": paginated.pages,
+            "has_more": paginated.has_next,
+        }
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    total = None
+    if args.get("withTotal", "").lower() in ("1", "true"):
+        total = query.order_by(None).count()
+
+    token = args.get("cursor")
+    seek_query = query
+    if token:
+        key, product_id = decode_cursor(token, sort_by)
+        seek_query = _seek(query, column, direction, key, product_id)
+
+    # Select the sort key alongside each product so the next cursor can be
+    # built from the last row as the database saw it
+    rows = (
+        apply_sort(seek_query.add_columns(column.label("sort_key")), column, direction)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last, last_key = rows[-1]
+        next_cursor = encode_cursor(sort_by, last_key, last.id)
+
+    return [product for product, _ in rows], {
+        "total": total,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+    }
+
+
+# ------------------------------
+# LISTINGS
+# ------------------------------
+# The serialized listings shared by the product routes, /api/all-products
+# and /api/batch, so each is built in exactly one place.
+def featured_products(fields=None):
+    return (
+        db.session.query(Product)
+        .options(*product_load_options(fields))
+        .filter(Product.featured == True)
+        .all()
+    )
+
+
+def product_listing(args):
+    """Serialize one page of /api/products for the given query args.
+
+    Raises InvalidFields or InvalidCursor for unusable args.
+    """
+    fields = read_fields(args)
+    items, meta = paginate_products(read_filters(args), args, fields)
+    return {"products": [p.to_dict(fields) for p in items], **meta}
+
+
+def category_list():
+    """Serialize every category, as /api/categories returns them."""
+    return [c.to_dict() for c in db.session.query(Category).all()]
+
+
+# ------------------------------
+# FACETS
+# ------------------------------
+def product_facets(filters):
+    """Count the filtered products per category, price bucket and rating.
+
+    Everything comes from a single GROUP BY over (category, price bucket,
+    rating floor); the three facets are then summed from that small cube in
+    Python instead of issuing one COUNT per filter value.
+    """
+    price_bucket = case(
+        *[(Product.price < bound, i) for i, bound in enumerate(PRICE_BUCKETS)],
+        else_=len(PRICE_BUCKETS),
+    )
+    rating_floor = cast(RATING_KEY, Integer)
+
+    query = (
+        db.session.query(
+            Category.id, Category.name, price_bucket, rating_floor, func.count()
+        )
+        .select_from(Product)
+        .outerjoin(Category, Category.id == Product.category_id)
+    )
+    query, _ = apply_filters(query, filters)
+    rows = query.group_by(Category.id, Category.name, price_bucket, rating_floor).all()
+
+    total = 0
+    categories = {}
+    prices = [0] * (len(PRICE_BUCKETS) + 1)
+    ratings = dict.fromkeys(RATING_LEVELS, 0)
+    for category_id, category_name, bucket, floor, count in rows:
+        total += count
+        entry = categories.setdefault(
+            category_id, {"id": category_id, "name": category_name, "count": 0}
+        )
+        entry["count"] += count
+        prices[bucket] += count
+        # minRating is inclusive, so a product counts towards every level
+        # at or below its rating
+        for level in RATING_LEVELS:
+            if floor >= level:
+                ratings[level] += count
+
+    bounds = (0,) + PRICE_BUCKETS + (None,)
+    return {
+        "total": total,
+        "categories": sorted(
+            categories.values(), key=lambda c: (c["name"] is None, c["name"] or "")
+        ),
+        "price": [
+            {"min": bounds[i], "max": bounds[i + 1], "count": count}
+            for i, count in enumerate(prices)
+        ],
+        "rating": [
+            {"min": level, "count": ratings[level]} for level in reversed(RATING_LEVELS)
+        ],
+    }
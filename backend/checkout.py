@@ -0,0 +1,133 @@
+import random
+import time
+
+from sqlalchemy import delete, insert, tuple_, update
+from sqlalchemy.exc import OperationalError
+from models import db, Product, CartItem, Order, OrderItem
+
+# ------------------------------
+# CHECKOUT
+# ------------------------------
+# Stock is never read, modified and written back. Every reservation is a
+# conditional UPDATE ... SET stock = stock - :q WHERE stock >= :q, so two
+# buyers racing for the last unit cannot both succeed. A whole cart is
+# reserved, turned into an order and cleared in one short transaction; a
+# missing unit rolls everything back. Lock contention (SQLite "database is
+# locked", Postgres serialization failures) is retried a bounded number of
+# times with jittered backoff.
+#
+# The cart is read before the write transaction takes its lock, so clearing
+# it is a compare-and-set: only the exact (id, quantity) rows that were read
+# are deleted. If a line changed or vanished in between (a quantity bump, a
+# removal, another checkout of the same cart) the order is rolled back and
+# retried against the current cart, so nothing is lost or ordered twice.
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 0.01
+
+
+class CheckoutError(Exception):
+    """Raised when a cart cannot be turned into an order."""
+
+
+class OutOfStock(CheckoutError):
+    def __init__(self, product_ids):
+        super().__init__("Not enough stock")
+        self.product_ids = product_ids
+
+
+class CheckoutBusy(CheckoutError):
+    """Raised when the database stayed locked through every retry."""
+
+
+class _CartChanged(Exception):
+    """The cart changed between reading it and clearing it."""
+
+
+def is_contention_error(error):
+    orig = getattr(error, "orig", None)
+    if getattr(orig, "pgcode", None) in ("40001", "40P01"):
+        return True
+    return "locked" in str(orig).lower() or "busy" in str(orig).lower()
+
+
+def reserve_stock(product_id, quantity):
+    """Atomically take ``quantity`` units; returns False if not enough left."""
+    result = db.session.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.stock >= quantity)
+        .values(stock=Product.stock - quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def adjust_stock(product_id, delta):
+    """Add (or with a negative delta, remove) stock without going below 0."""
+    result = db.session.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.stock + delta >= 0)
+        .values(stock=Product.stock + delta)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _place_order(user_id):
+    lines = (
+        db.session.query(CartItem.id, CartItem.product_id, CartItem.quantity, Product.price)
+        .join(Product, Product.id == CartItem.product_id)
+        .filter(CartItem.user_id == user_id)
+        # A fixed lock order keeps concurrent checkouts from deadlocking
+        .order_by(CartItem.product_id)
+        .all()
+    )
+    if not lines:
+        raise CheckoutError("Cart is empty")
+
+    cleared = db.session.execute(
+        delete(CartItem)
+        .where(tuple_(CartItem.id, CartItem.quantity).in_(
+            [(item_id, quantity) for item_id, _, quantity, _ in lines]
+        ))
+        .execution_options(synchronize_session=False)
+    )
+    if cleared.rowcount != len(lines):
+        raise _CartChanged()
+
+    short = [pid for _, pid, quantity, _ in lines if not reserve_stock(pid, quantity)]
+    if short:
+        raise OutOfStock(short)
+
+    total = round(sum(quantity * price for _, _, quantity, price in lines), 2)
+    order = Order(user_id=user_id, total=total)
+    db.session.add(order)
+    db.session.flush()
+    db.session.execute(insert(OrderItem), [
+        {"order_id": order.id, "product_id": pid, "quantity": quantity,
+         "unit_price": price}
+        for _, pid, quantity, price in lines
+    ])
+    db.session.commit()
+    return order
+
+
+def checkout(user_id, max_retries=MAX_RETRIES):
+    """Turn a user's cart into an order, reserving stock for every line."""
+    for attempt in range(max_retries + 1):
+        try:
+            return _place_order(user_id)
+        except CheckoutError:
+            db.session.rollback()
+            raise
+        except _CartChanged:
+            db.session.rollback()
+            if attempt == max_retries:
+                raise CheckoutBusy("The cart is being changed, please retry")
+        except OperationalError as e:
+            db.session.rollback()
+            if not is_contention_error(e):
+                raise
+            if attempt == max_retries:
+                raise CheckoutBusy("Checkout is busy, please retry")
+            time.sleep(RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
@@ -0,0 +1,79 @@
+import gzip
+
+from flask import current_app, has_request_context, request
+
+# ------------------------------
+# RESPONSE COMPRESSION
+# ------------------------------
+# JSON responses of at least COMPRESS_MIN_SIZE bytes are gzipped when the
+# client sends Accept-Encoding: gzip. Smaller bodies are sent as-is: the
+# gzip framing and CPU cost outweigh the bytes saved on a single product or
+# an error message. Streamed responses (the NDJSON export) are left alone.
+# The response cache keeps the compressed body next to the plain one, so a
+# cache hit is never compressed twice.
+COMPRESSIBLE_MIMETYPES = ("application/json",)
+
+
+class Compression:
+    """Settings are read from the current app's config, so apps built in
+    one process can compress differently."""
+
+    def __init__(self, min_size=1024, level=6):
+        self.min_size = min_size
+        self.level = level
+
+    def init_app(self, app):
+        min_size = app.config.setdefault("COMPRESS_MIN_SIZE", self.min_size)
+        app.config.setdefault("COMPRESS_LEVEL", self.level)
+        app.extensions["compression"] = self
+        # A threshold of 0 or less turns compression off
+        if min_size > 0:
+            app.after_request(self._compress_response)
+
+    def wants_gzip(self, body, mimetype):
+        """Whether ``body`` should be sent gzipped to the current client."""
+        if not has_request_context() or mimetype not in COMPRESSIBLE_MIMETYPES:
+            return False
+        min_size = current_app.config["COMPRESS_MIN_SIZE"]
+        return (
+            min_size > 0
+            and len(body) >= min_size
+            and request.accept_encodings["gzip"] > 0
+        )
+
+    def compress(self, body):
+        # mtime=0 keeps the output, and so the ETag, stable across calls
+        level = current_app.config["COMPRESS_LEVEL"]
+        return gzip.compress(body, compresslevel=level, mtime=0)
+
+    def _compress_response(self, response):
+        if (
+            response.status_code != 200
+            or response.is_streamed
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        body = response.get_data()
+        if not self.wants_gzip(body, response.mimetype):
+            return response
+        response.set_data(self.compress(body))
+        mark_gzipped(response)
+        return response
+
+
+def mark_gzipped(response):
+    """Label a response whose body was just replaced by its gzip form.
+
+    The gzip variant gets its own ETag so caches never confuse the two.
+    """
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-gzip", weak)
+
+
+compression = Compression()
@@ -0,0 +1,121 @@
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+
+# ------------------------------
+# ENGINE PROFILE
+# ------------------------------
+# SQLite runs in WAL mode so readers never block the writer, with a busy
+# timeout instead of failing immediately on a locked database. Reads made
+# while handling GET requests go through a separate "read" engine (its own
+# connection pool, opened query-only), which can also point at a replica
+# via READ_DATABASE_URL so catalog reads scale independently of writes.
+# Views that only read but take a POST body (the batch endpoint) opt in with
+# the @read_only decorator.
+READ_BIND = "read"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+SQLITE_DEFAULTS = {
+    "SQLITE_JOURNAL_MODE": "WAL",
+    "SQLITE_SYNCHRONOUS": "NORMAL",
+    "SQLITE_BUSY_TIMEOUT_MS": 5000,
+    "SQLITE_CACHE_SIZE_KB": 64 * 1024,
+    "SQLITE_MMAP_SIZE": 256 * 1024 * 1024,
+}
+
+
+def read_only(view):
+    """Mark a view as read-only so its queries use the read pool."""
+    view.read_only = True
+    return view
+
+
+def _is_read_request():
+    if request.method in READ_METHODS:
+        return True
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, "read_only", False)
+
+
+class RoutingSession(Session):
+    """Send SELECTs issued while serving a read-only request to the read pool."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and READ_BIND in self._db.engines
+            and has_request_context()
+            and _is_read_request()
+            and (clause is None or isinstance(clause, Select))
+        ):
+            return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_memory(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(url, pool_size, max_overflow):
+    """Pool settings for a URL; in-memory SQLite keeps its single static pool."""
+    if _is_memory(make_url(url)):
+        return {}
+    return {"pool_size": pool_size, "max_overflow": max_overflow, "pool_pre_ping": True}
+
+
+def configure_database(app, db):
+    """Set up the write and read engines for ``app`` and bind ``db`` to it."""
+    for key, value in SQLITE_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    app.config.setdefault("DB_POOL_SIZE", 5)
+    app.config.setdefault("DB_MAX_OVERFLOW", 10)
+    app.config.setdefault("READ_DATABASE_URL", None)
+    app.config.setdefault("READ_POOL_SIZE", 10)
+    app.config.setdefault("SEPARATE_READ_POOL", True)
+
+    url = app.config["SQLALCHEMY_DATABASE_URI"]
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(
+        url, app.config["DB_POOL_SIZE"], app.config["DB_MAX_OVERFLOW"]
+    ))
+
+    read_url = app.config["READ_DATABASE_URL"]
+    if read_url is None and app.config["SEPARATE_READ_POOL"] and not _is_memory(make_url(url)):
+        read_url = url
+    if read_url:
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        binds[READ_BIND] = {"url": read_url, **engine_options(
+            read_url, app.config["READ_POOL_SIZE"], app.config["DB_MAX_OVERFLOW"]
+        )}
+
+    db.init_app(app)
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name == "sqlite":
+                _apply_sqlite_profile(engine, app.config, read_only=key == READ_BIND)
+
+
+def _apply_sqlite_profile(engine, config, read_only):
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    elif not _is_memory(engine.url):
+        # The journal mode is stored in the database file, so only the
+        # writer needs to set it
+        pragmas.insert(0, f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
@@ -0,0 +1,15 @@
+# Gunicorn settings: run `gunicorn` from the backend directory.
+#
+# The app is built once in the master (preload_app), so importing the code,
+# the schema/index checks and the optional WARM_CACHE warm-up happen once
+# instead of in every worker. Workers are forked from the finished app and
+# inherit its warm response cache and autocomplete index; create_app closes
+# its database connections before the fork, so each worker opens its own.
+import os
+
+wsgi_app = "app:create_app()"
+preload_app = True
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
@@ -0,0 +1,199 @@
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+# ------------------------------
+# REQUEST / SQL INSTRUMENTATION
+# ------------------------------
+# Flask request hooks time each request and SQLAlchemy cursor events count
+# the statements, SQL time and rows it caused. Totals are kept per route
+# rule (e.g. /api/products/<int:product_id>) and exposed in the Prometheus
+# text format at /metrics. With METRICS_ENABLED off, no hooks or listeners
+# are registered at all. Each gunicorn worker keeps its own totals.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+slow_query_log = logging.getLogger("quickcart.slow_query")
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """Collapse literals, IN lists and whitespace so similar queries group."""
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _IN_LIST.sub("(...)", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+
+class RouteStats:
+    def __init__(self):
+        self.requests = defaultdict(int)  # status code -> count
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.duration_sum = 0.0
+        self.count = 0
+        self.response_bytes = 0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.sql_rows = 0
+
+
+class Metrics:
+    """Flask extension: each app keeps its own totals in an AppMetrics,
+    stored in ``app.extensions["metrics"]``."""
+
+    def __init__(self):
+        self._listening_for_loads = False
+
+    def init_app(self, app):
+        app.config.setdefault("METRICS_ENABLED", True)
+        app.config.setdefault("SLOW_QUERY_MS", None)
+        if not app.config["METRICS_ENABLED"]:
+            return
+
+        state = app.extensions["metrics"] = AppMetrics(app.config["SLOW_QUERY_MS"])
+        app.before_request(state._start_request)
+        app.after_request(state._finish_request)
+        app.add_url_rule("/metrics", "metrics", state.render, methods=["GET"])
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", state._before_execute)
+            event.listen(engine, "after_cursor_execute", state._after_execute)
+        # Rows are counted into the request's g, whichever app it belongs to,
+        # so one listener serves them all
+        if not self._listening_for_loads:
+            event.listen(db.Model, "load", _on_load, propagate=True)
+            self._listening_for_loads = True
+
+
+def _on_load(target, context):
+    if has_request_context() and "metrics_sql" in g:
+        g.metrics_sql[2] += 1
+
+
+class AppMetrics:
+    def __init__(self, slow_query_ms=None):
+        self.routes = defaultdict(RouteStats)
+        self.slow_query_seconds = None if slow_query_ms is None else slow_query_ms / 1000
+        self._lock = threading.Lock()
+
+    # Flask hooks
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql = [0, 0.0, 0]  # statements, seconds, rows
+
+    def _finish_request(self, response):
+        started = g.get("metrics_started")
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        key = (request.method, route)
+        statements, sql_seconds, rows = g.metrics_sql
+
+        with self._lock:
+            stats = self.routes[key]
+            stats.requests[response.status_code] += 1
+            stats.count += 1
+            stats.duration_sum += elapsed
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    stats.buckets[i] += 1
+            stats.response_bytes += response.content_length or 0
+            stats.sql_statements += statements
+            stats.sql_seconds += sql_seconds
+            stats.sql_rows += rows
+        return response
+
+    # SQLAlchemy events
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        if has_request_context() and "metrics_sql" in g:
+            counters = g.metrics_sql
+            counters[0] += 1
+            counters[1] += elapsed
+            # rowcount is only meaningful for DML; SELECT rows are counted
+            # as they are loaded into ORM objects
+            if cursor.rowcount > 0:
+                counters[2] += cursor.rowcount
+        if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+            slow_query_log.warning(
+                "%.1fms %s", elapsed * 1000, normalize_sql(statement)
+            )
+
+    # Exposition
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            routes = sorted(self.routes.items())
+
+            family("quickcart_http_requests_total", "counter", "HTTP requests by status.")
+            for (method, route), stats in routes:
+                for status, count in sorted(stats.requests.items()):
+                    lines.append(
+                        f'quickcart_http_requests_total{{method="{method}",'
+                        f'route="{route}",status="{status}"}} {count}'
+                    )
+
+            family("quickcart_http_request_duration_seconds", "histogram",
+                   "Time spent handling a request.")
+            for (method, route), stats in routes:
+                labels = f'method="{method}",route="{route}"'
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    lines.append(
+                        f'quickcart_http_request_duration_seconds_bucket'
+                        f'{{{labels},le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f'quickcart_http_request_duration_seconds_bucket'
+                    f'{{{labels},le="+Inf"}} {stats.count}'
+                )
+                lines.append(
+                    f"quickcart_http_request_duration_seconds_sum{{{labels}}} "
+                    f"{stats.duration_sum:.6f}"
+                )
+                lines.append(
+                    f"quickcart_http_request_duration_seconds_count{{{labels}}} "
+                    f"{stats.count}"
+                )
+
+            for name, attr, help_text in (
+                ("quickcart_http_response_bytes_total", "response_bytes",
+                 "Response body bytes sent."),
+                ("quickcart_sql_statements_total", "sql_statements",
+                 "SQL statements executed while handling requests."),
+                ("quickcart_sql_duration_seconds_total", "sql_seconds",
+                 "Time spent executing SQL while handling requests."),
+                ("quickcart_sql_rows_total", "sql_rows",
+                 "Rows loaded into ORM objects or affected by DML."),
+            ):
+                family(name, "counter", help_text)
+                for (method, route), stats in routes:
+                    value = getattr(stats, attr)
+                    if isinstance(value, float):
+                        value = f"{value:.6f}"
+                    lines.append(f'{name}{{method="{method}",route="{route}"}} {value}')
+
+        return Response("\n".join(lines) + "\n",
+                        mimetype="text/plain; version=0.0.4")
+
+
+metrics = Metrics()
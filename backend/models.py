@@ -1,7 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, inspect, literal_column, text, update
+from sqlalchemy.orm import joinedload, configure_mappers
+from sqlalchemy.schema import CreateIndex
 from datetime import datetime
+from database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # -----------------------------
 # CATEGORY MODEL
@@ -38,6 +42,14 @@ class Product(db.Model):
     stock = db.Column(db.Integer, nullable=False, default=0)
     image_url = db.Column(db.String(500))
     rating = db.Column(db.Float, default=0.0)
+    # Review aggregates, kept in step with the reviews table by reviews.py.
+    # rating holds their average once a product has been reviewed, so
+    # listings filter and sort on it without touching reviews, and falls
+    # back to base_rating (the rating it was created or imported with)
+    # while it has no reviews.
+    base_rating = db.Column(db.Float)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default=text("0"))
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default=text("0"))
     featured = db.Column(db.Boolean, default=False)  # ✅ Added for homepage
     category_id = db.Column(db.Integer, db.ForeignKey("categories.id"), nullable=True)
 
@@ -46,7 +58,10 @@ class Product(db.Model):
     def __repr__(self):
         return f"<Product {self.name}>"
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
+        """Serialize the product, or only ``fields`` (see PRODUCT_FIELDS)."""
+        if fields is not None:
+            return {field: _PRODUCT_FIELD_GETTERS[field](self) for field in fields}
         return {
             "id": self.id,
             "name": self.name,
@@ -55,11 +70,49 @@ class Product(db.Model):
             "stock": self.stock,
             "image_url": self.image_url,
             "rating": self.rating,
+            "rating_count": self.rating_count,
             "featured": self.featured,  # ✅ Added in JSON response
             "category": self.category.name if self.category else None,
         }
 
 
+# Fields a client can ask for with ?fields=, in to_dict() order. Each only
+# touches its own column (or the category relationship), so a sparse
+# serialization never triggers a lazy load of a column that was not selected.
+_PRODUCT_FIELD_GETTERS = {
+    "id": lambda p: p.id,
+    "name": lambda p: p.name,
+    "description": lambda p: p.description,
+    "price": lambda p: p.price,
+    "stock": lambda p: p.stock,
+    "image_url": lambda p: p.image_url,
+    "rating": lambda p: p.rating,
+    "rating_count": lambda p: p.rating_count,
+    "featured": lambda p: p.featured,
+    "category": lambda p: p.category.name if p.category else None,
+}
+PRODUCT_FIELDS = tuple(_PRODUCT_FIELD_GETTERS)
+
+
+# Rating as listings sort and filter on it: unrated products count as 0
+RATING_KEY = func.coalesce(Product.rating, literal_column("0"))
+
+# -----------------------------
+# PRODUCT INDEXES
+# -----------------------------
+# One index per listing sort, plus category-prefixed variants for the Shop's
+# category filter. Product.id is the rowid, which SQLite appends to every
+# index, so these also cover the "ORDER BY key, id" tiebreaker used for
+# cursor pagination.
+db.Index("ix_products_name", Product.name)
+db.Index("ix_products_price", Product.price)
+db.Index("ix_products_rating", RATING_KEY)
+db.Index("ix_products_featured", Product.featured)
+db.Index("ix_products_category_name", Product.category_id, Product.name)
+db.Index("ix_products_category_price", Product.category_id, Product.price)
+db.Index("ix_products_category_rating", Product.category_id, RATING_KEY)
+
+
 # -----------------------------
 # USER MODEL
 # -----------------------------
@@ -90,6 +143,14 @@ class User(db.Model):
 # -----------------------------
 class CartItem(db.Model):
     __tablename__ = "cart_items"
+    __table_args__ = (
+        # One row per product in a user's cart; adding again bumps quantity
+        db.Index("ux_cart_items_user_product", "user_id", "product_id", unique=True),
+        # Lists a user's cart in the order items were added (rowid order)
+        db.Index("ix_cart_items_user", "user_id"),
+        # Finds the carts holding a product, for related-product co-occurrence
+        db.Index("ix_cart_items_product", "product_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -108,3 +169,229 @@ class CartItem(db.Model):
             "product": self.product.to_dict(),
             "quantity": self.quantity,
         }
+
+
+
+# -----------------------------
+# ORDER MODELS
+# -----------------------------
+class Order(db.Model):
+    __tablename__ = "orders"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default="placed")
+    total = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationship: One order -> Many order items
+    items = db.relationship("OrderItem", backref="order", lazy=True)
+
+    def __repr__(self):
+        return f"<Order {self.id} User:{self.user_id}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "total": self.total,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "items": [item.to_dict() for item in self.items],
+        }
+
+
+class OrderItem(db.Model):
+    __tablename__ = "order_items"
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    # Price at the time of purchase, independent of later product edits
+    unit_price = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f"<OrderItem Order:{self.order_id} Product:{self.product_id}>"
+
+    def to_dict(self):
+        return {
+            "product_id": self.product_id,
+            "quantity": self.quantity,
+            "unit_price": self.unit_price,
+        }
+
+
+# -----------------------------
+# REVIEW MODEL
+# -----------------------------
+class Review(db.Model):
+    __tablename__ = "reviews"
+    __table_args__ = (
+        # One review per user and product
+        db.Index("ux_reviews_product_user", "product_id", "user_id", unique=True),
+        # (product_id, rowid): the newest-first keyset listing of a product
+        db.Index("ix_reviews_product", "product_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    rating = db.Column(db.Integer, nullable=False)
+    comment = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Review {self.id} Product:{self.product_id} User:{self.user_id}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "product_id": self.product_id,
+            "user_id": self.user_id,
+            "rating": self.rating,
+            "comment": self.comment,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+# -----------------------------
+# RELATED PRODUCTS
+# -----------------------------
+class RelatedProduct(db.Model):
+    """One precomputed neighbour of a product, maintained by related.py."""
+    __tablename__ = "related_products"
+
+    product_id = db.Column(db.Integer, primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    related_id = db.Column(db.Integer, nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+
+class RelatedStale(db.Model):
+    """Products whose neighbours must be recomputed before they are served."""
+    __tablename__ = "related_stale"
+
+    product_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+# -----------------------------
+# RESPONSE CACHE
+# -----------------------------
+class CacheVersion(db.Model):
+    """Shared version of a response-cache namespace, bumped on invalidation."""
+    __tablename__ = "cache_versions"
+
+    namespace = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# -----------------------------
+# EAGER LOADING
+# -----------------------------
+# Loader options that fetch everything to_dict() reads in the same SELECT, so
+# serializing a page of products or a cart is one round trip instead of one
+# lazy load per row. Mappers are configured first so the backref attributes
+# (Product.category) exist.
+configure_mappers()
+PRODUCT_LOAD_OPTIONS = (joinedload(Product.category),)
+CART_ITEM_LOAD_OPTIONS = (
+    joinedload(CartItem.product).joinedload(Product.category),
+)
+ORDER_LOAD_OPTIONS = (joinedload(Order.items),)
+
+
+# -----------------------------
+# SCHEMA UPGRADES
+# -----------------------------
+# There are no migrations: db.create_all() only creates missing tables, so
+# columns and indexes added to existing models are created here as well.
+def ensure_schema():
+    db.create_all()
+    engine = db.engine
+    added = add_missing_columns(engine)
+    if ("products", "base_rating") in added:
+        # Only unreviewed products still show the rating they were given
+        with engine.begin() as conn:
+            conn.execute(
+                update(Product)
+                .where(Product.rating_count == 0)
+                .values(base_rating=Product.rating)
+            )
+    existing = existing_indexes(engine)
+    if "ux_cart_items_user_product" not in existing.get("cart_items", ()):
+        merge_duplicate_cart_items()
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing.get(table.name, ()):
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def existing_indexes(engine):
+    """Map each table to the names of its indexes.
+
+    SQLite's index list is read from sqlite_master: reflection skips (and
+    warns about) expression indexes such as ix_products_rating.
+    """
+    if engine.dialect.name == "sqlite":
+        existing = {}
+        with engine.connect() as conn:
+            for table, name in conn.execute(text(
+                "SELECT tbl_name, name FROM sqlite_master WHERE type = 'index'"
+            )):
+                existing.setdefault(table, set()).add(name)
+        return existing
+    inspector = inspect(engine)
+    return {
+        table: {index["name"] for index in inspector.get_indexes(table)}
+        for table in inspector.get_table_names()
+    }
+
+
+def add_missing_columns(engine):
+    """ALTER TABLE ... ADD COLUMN for model columns an existing table lacks.
+
+    Added columns need a server_default (or to be nullable) so the rows
+    already in the table get a value. Returns the (table, column) pairs added.
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    quote = engine.dialect.identifier_preparer.quote
+    added = []
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                ddl = (f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                       f"{column.type.compile(engine.dialect)}")
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg.text}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                conn.execute(text(ddl))
+                added.append((table.name, column.name))
+    return added
+
+
+def merge_duplicate_cart_items():
+    """Fold repeated (user, product) cart rows into the oldest one."""
+    with db.engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE cart_items SET quantity = (
+                SELECT SUM(c2.quantity) FROM cart_items c2
+                WHERE c2.user_id = cart_items.user_id
+                  AND c2.product_id = cart_items.product_id
+            )
+            WHERE id IN (
+                SELECT MIN(id) FROM cart_items
+                GROUP BY user_id, product_id HAVING COUNT(*) > 1
+            )
+        """))
+        conn.execute(text("""
+            DELETE FROM cart_items WHERE id NOT IN (
+                SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id
+            )
+        """))
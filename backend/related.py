@@ -0,0 +1,338 @@
+import math
+import re
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import text
+from models import db, Product, RelatedProduct, RelatedStale
+from catalog import product_load_options
+from search import FTS_TABLE, search_index_ready
+
+# ------------------------------
+# RELATED PRODUCTS
+# ------------------------------
+# The TOP_K neighbours of every product are precomputed into related_products
+# (product_id, rank) -> related_id, so serving them is one primary-key range
+# read. Candidates come from four cheap indexed lookups instead of a catalog
+# scan: the nearest prices in the same category, full-text matches on the
+# name, and products that share a cart or an order with it. Each candidate
+# is then scored on category, price band, word overlap and co-occurrence.
+#
+# SQLite triggers queue products in related_stale whenever something that
+# feeds their neighbours changes (the product itself, a neighbour, a cart or
+# an order holding it), including bulk statements that bypass the ORM.
+# Reads never write: they serve the stored rows and wake a per-app
+# background refresher, which drains the queue at most once every
+# RELATED_REFRESH_SECONDS. A refresh that fails (say, on a locked database)
+# is logged and retried on the next wake-up. The refresh-related command
+# drains the queue in batches too. Other databases have no triggers and
+# rely on refresh-related --all.
+TOP_K = 12
+CANDIDATES = 30
+# A price within this factor of the product's still counts as nearby
+PRICE_BAND = 2.0
+WEIGHTS = {"category": 1.0, "price": 0.5, "text": 1.0, "together": 2.0}
+MAX_QUERY_WORDS = 8
+# Words of three or more letters; digits (SKU and model numbers) are ignored
+_WORD = re.compile(r"[^\W\d_]{3,}")
+
+# Marks every product whose neighbour list mentions ``{id}`` as stale
+_MARK_LISTERS = """
+    INSERT OR IGNORE INTO related_stale (product_id)
+    SELECT product_id FROM related_products WHERE related_id = {id};
+"""
+
+RELATED_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS related_product_insert AFTER INSERT ON products
+    BEGIN
+        INSERT OR IGNORE INTO related_stale (product_id) VALUES (new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS related_product_update
+    AFTER UPDATE OF name, description, price, category_id ON products
+    BEGIN
+        INSERT OR IGNORE INTO related_stale (product_id) VALUES (new.id);
+        {_MARK_LISTERS.format(id="new.id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS related_product_delete AFTER DELETE ON products
+    BEGIN
+        {_MARK_LISTERS.format(id="old.id")}
+        DELETE FROM related_products WHERE product_id = old.id OR related_id = old.id;
+        DELETE FROM related_stale WHERE product_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS related_cart_insert AFTER INSERT ON cart_items
+    BEGIN
+        INSERT OR IGNORE INTO related_stale (product_id)
+        SELECT product_id FROM cart_items WHERE user_id = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS related_cart_delete AFTER DELETE ON cart_items
+    BEGIN
+        INSERT OR IGNORE INTO related_stale (product_id) VALUES (old.product_id);
+        INSERT OR IGNORE INTO related_stale (product_id)
+        SELECT product_id FROM cart_items WHERE user_id = old.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS related_order_insert AFTER INSERT ON order_items
+    BEGIN
+        INSERT OR IGNORE INTO related_stale (product_id)
+        SELECT product_id FROM order_items WHERE order_id = new.order_id;
+    END
+    """,
+]
+
+NEAREST_PRICE_SQL = """
+    SELECT id FROM (
+        SELECT id FROM products
+        WHERE category_id = :category_id AND price >= :price AND id != :id
+        ORDER BY price LIMIT :limit
+    )
+    UNION ALL
+    SELECT id FROM (
+        SELECT id FROM products
+        WHERE category_id = :category_id AND price < :price
+        ORDER BY price DESC LIMIT :limit
+    )
+"""
+
+TEXT_MATCH_SQL = f"""
+    SELECT rowid FROM {FTS_TABLE}
+    WHERE {FTS_TABLE} MATCH :expression AND rowid != :id
+    ORDER BY rank LIMIT :limit
+"""
+
+# Number of distinct carts and orders a product shares with each other one
+TOGETHER_SQL = """
+    SELECT product_id, COUNT(*) FROM (
+        SELECT other.product_id, 'c' || other.user_id AS basket
+        FROM cart_items mine
+        JOIN cart_items other ON other.user_id = mine.user_id
+        WHERE mine.product_id = :id AND other.product_id != :id
+        UNION
+        SELECT other.product_id, 'o' || other.order_id
+        FROM order_items mine
+        JOIN order_items other ON other.order_id = mine.order_id
+        WHERE mine.product_id = :id AND other.product_id != :id
+    )
+    GROUP BY product_id ORDER BY COUNT(*) DESC LIMIT :limit
+"""
+
+CANDIDATE_SQL = """
+    SELECT id, name, description, price, category_id FROM products
+    WHERE id IN ({ids})
+"""
+
+
+def ensure_related_index():
+    """Create the staleness triggers; a new setup marks every product stale.
+
+    Safe to call on every startup. Does nothing on non-SQLite databases.
+    """
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        existed = conn.execute(text(
+            "SELECT 1 FROM sqlite_master "
+            "WHERE type = 'trigger' AND name = 'related_product_insert'"
+        )).first() is not None
+        for statement in RELATED_DDL:
+            conn.execute(text(statement))
+        if not existed:
+            conn.execute(text(
+                "INSERT OR IGNORE INTO related_stale (product_id) SELECT id FROM products"
+            ))
+
+
+def _words(*values):
+    return set(_WORD.findall(" ".join(value or "" for value in values).lower()))
+
+
+def _price_closeness(price, other):
+    if not price or not other or price <= 0 or other <= 0:
+        return 0.0
+    return max(0.0, 1 - abs(math.log(other / price)) / math.log(PRICE_BAND))
+
+
+def compute_related(conn, product_id, top_k=TOP_K, word_cache=None):
+    """Score the candidate neighbours of one product; returns [(id, score)].
+
+    ``word_cache`` maps product ids to their word sets and can be shared
+    across calls, since the same candidates recur within a category.
+    """
+    if word_cache is None:
+        word_cache = {}
+    row = conn.execute(
+        text("SELECT name, description, price, category_id FROM products WHERE id = :id"),
+        {"id": product_id},
+    ).first()
+    if row is None:
+        return []
+    name, description, price, category_id = row
+
+    candidates = set()
+    if category_id is not None:
+        candidates.update(r[0] for r in conn.execute(text(NEAREST_PRICE_SQL), {
+            "id": product_id, "category_id": category_id, "price": price,
+            "limit": CANDIDATES // 2,
+        }))
+
+    name_words = sorted(_words(name))[:MAX_QUERY_WORDS]
+    if name_words and search_index_ready():
+        expression = " OR ".join(f'"{word}"' for word in name_words)
+        candidates.update(r[0] for r in conn.execute(text(TEXT_MATCH_SQL), {
+            "id": product_id, "expression": expression, "limit": CANDIDATES,
+        }))
+
+    together = dict(conn.execute(text(TOGETHER_SQL), {
+        "id": product_id, "limit": CANDIDATES,
+    }).all())
+    candidates.update(together)
+    candidates.discard(product_id)
+    if not candidates:
+        return []
+
+    words = _words(name, description)
+    most_together = max(together.values(), default=0)
+    scores = []
+    rows = conn.execute(text(CANDIDATE_SQL.format(
+        ids=",".join(str(int(c)) for c in candidates)
+    )))
+    for other_id, other_name, other_description, other_price, other_category in rows:
+        other_words = word_cache.get(other_id)
+        if other_words is None:
+            other_words = word_cache[other_id] = _words(other_name, other_description)
+        overlap = len(words & other_words) / len(words | other_words) if words else 0.0
+        score = (
+            WEIGHTS["category"] * (category_id is not None and other_category == category_id)
+            + WEIGHTS["price"] * _price_closeness(price, other_price)
+            + WEIGHTS["text"] * overlap
+            + WEIGHTS["together"] * (together.get(other_id, 0) / most_together
+                                     if most_together else 0.0)
+        )
+        scores.append((other_id, round(score, 4)))
+
+    scores.sort(key=lambda pair: (-pair[1], pair[0]))
+    return scores[:top_k]
+
+
+def refresh_related(product_ids):
+    """Recompute and store the neighbours of ``product_ids``."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    with db.engine.begin() as conn:
+        word_cache = {}
+        computed = {
+            pid: compute_related(conn, pid, word_cache=word_cache) for pid in product_ids
+        }
+        conn.execute(
+            RelatedProduct.__table__.delete()
+            .where(RelatedProduct.product_id.in_(product_ids))
+        )
+        rows = [
+            {"product_id": pid, "rank": rank, "related_id": related_id, "score": score}
+            for pid, neighbours in computed.items()
+            for rank, (related_id, score) in enumerate(neighbours)
+        ]
+        if rows:
+            conn.execute(RelatedProduct.__table__.insert(), rows)
+        conn.execute(
+            RelatedStale.__table__.delete()
+            .where(RelatedStale.product_id.in_(product_ids))
+        )
+
+
+def refresh_stale(batch_size=500, rebuild=False):
+    """Drain the stale queue (everything, with ``rebuild``); returns the count."""
+    if rebuild:
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                "INSERT OR IGNORE INTO related_stale (product_id) SELECT id FROM products"
+                if db.engine.dialect.name == "sqlite" else
+                "INSERT INTO related_stale (product_id) SELECT id FROM products "
+                "WHERE id NOT IN (SELECT product_id FROM related_stale)"
+            ))
+    refreshed = 0
+    while True:
+        with db.engine.connect() as conn:
+            batch = [r[0] for r in conn.execute(
+                text("SELECT product_id FROM related_stale ORDER BY product_id LIMIT :n"),
+                {"n": batch_size},
+            )]
+        if not batch:
+            return refreshed
+        refresh_related(batch)
+        refreshed += len(batch)
+
+
+def related_products(product_id, limit=TOP_K, fields=None):
+    """Return the stored neighbours of a product, stale or not."""
+    return (
+        db.session.query(Product)
+        .join(RelatedProduct, RelatedProduct.related_id == Product.id)
+        .options(*product_load_options(fields))
+        .filter(RelatedProduct.product_id == product_id)
+        .order_by(RelatedProduct.rank)
+        .limit(limit)
+        .all()
+    )
+
+
+class RelatedRefresher:
+    """Flask extension: each app drains its stale queue on its own thread."""
+
+    def init_app(self, app):
+        app.config.setdefault("RELATED_REFRESH_SECONDS", 10)
+        app.extensions["related_refresher"] = StaleQueueRefresher(app)
+
+    def wake(self):
+        current_app.extensions["related_refresher"].wake()
+
+
+class StaleQueueRefresher:
+    def __init__(self, app):
+        # None or 0 leaves the queue to the refresh-related command
+        self.interval = app.config["RELATED_REFRESH_SECONDS"]
+        self._app = app
+        self._running = False
+        self._last_started = None
+        self._lock = threading.Lock()
+
+    def wake(self):
+        """Start a refresh on a thread unless one ran or is running recently."""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._running or (
+                self._last_started is not None and now - self._last_started < self.interval
+            ):
+                return
+            self._running = True
+            self._last_started = now
+        # Started on demand rather than from a timer, so it also works in
+        # gunicorn workers forked after the master built the app
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self):
+        with self._app.app_context():
+            try:
+                refresh_stale()
+            except Exception:
+                self._app.logger.exception("Related products refresh failed")
+            finally:
+                with self._lock:
+                    self._running = False
+
+
+related_refresher = RelatedRefresher()
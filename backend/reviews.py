@@ -0,0 +1,175 @@
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, Product, Review
+
+# ------------------------------
+# REVIEWS
+# ------------------------------
+# Every review write adjusts products.rating_sum / rating_count (and the
+# rating average derived from them) with a relative UPDATE in the same
+# transaction, so the aggregates never need a pass over all reviews. Edits
+# and deletes are compare-and-set on the review's current rating: if another
+# request changed it in between, the write is retried against the new value
+# instead of applying a stale delta. A product without reviews shows its
+# base_rating, the rating it was created or imported with, and gets it back
+# when its last review is deleted.
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+MAX_ATTEMPTS = 5
+
+
+class InvalidReview(ValueError):
+    """Raised when a review request carries an unusable rating or user."""
+
+
+class ReviewConflict(Exception):
+    """Raised when a review kept changing underneath an edit or delete."""
+
+
+def _rating(value):
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= 5:
+        raise InvalidReview("rating must be an integer from 1 to 5")
+    return value
+
+
+def _adjust_aggregates(product_id, sum_delta, count_delta):
+    """Shift a product's review aggregates; returns False if it is missing."""
+    total = Product.rating_sum + sum_delta
+    count = Product.rating_count + count_delta
+    result = db.session.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(
+            rating_sum=total,
+            rating_count=count,
+            rating=case((count > 0, total * 1.0 / count), else_=Product.base_rating),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def add_review(product_id, user_id, rating, comment=None):
+    """Insert a review; returns None if the product does not exist."""
+    rating = _rating(rating)
+    if isinstance(user_id, bool) or not isinstance(user_id, int):
+        raise InvalidReview("user_id must be an integer")
+    if not _adjust_aggregates(product_id, rating, 1):
+        db.session.rollback()
+        return None
+    review = Review(product_id=product_id, user_id=user_id, rating=rating, comment=comment)
+    db.session.add(review)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise InvalidReview("This user has already reviewed the product")
+    return review
+
+
+def edit_review(review_id, rating=None, comment=None):
+    """Change a review's rating and/or comment; returns None if it is gone."""
+    if rating is not None:
+        rating = _rating(rating)
+    for _ in range(MAX_ATTEMPTS):
+        current = db.session.execute(
+            select(Review.product_id, Review.rating).where(Review.id == review_id)
+        ).first()
+        if current is None:
+            return None
+        product_id, old_rating = current
+        values = {}
+        if rating is not None:
+            values["rating"] = rating
+        if comment is not None:
+            values["comment"] = comment
+        if not values:
+            return db.session.get(Review, review_id)
+
+        result = db.session.execute(
+            update(Review)
+            .where(Review.id == review_id, Review.rating == old_rating)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            if rating is not None and rating != old_rating:
+                _adjust_aggregates(product_id, rating - old_rating, 0)
+            db.session.commit()
+            db.session.expire_all()
+            return db.session.get(Review, review_id)
+        db.session.rollback()
+    raise ReviewConflict("The review is being edited concurrently, please retry")
+
+
+def delete_review(review_id):
+    """Delete a review; returns its product id, or None if it is gone."""
+    for _ in range(MAX_ATTEMPTS):
+        current = db.session.execute(
+            select(Review.product_id, Review.rating).where(Review.id == review_id)
+        ).first()
+        if current is None:
+            return None
+        product_id, old_rating = current
+        result = db.session.execute(
+            delete(Review)
+            .where(Review.id == review_id, Review.rating == old_rating)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            _adjust_aggregates(product_id, -old_rating, -1)
+            db.session.commit()
+            return product_id
+        db.session.rollback()
+    raise ReviewConflict("The review is being edited concurrently, please retry")
+
+
+def list_reviews(product_id, args):
+    """One newest-first page of a product's reviews plus a cursor.
+
+    The cursor is the id of the last review returned; the next page reads
+    ``WHERE product_id = ? AND id < cursor`` straight off the
+    (product_id, id) index.
+    """
+    limit = max(1, min(args.get("limit", DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    query = db.session.query(Review).filter(Review.product_id == product_id)
+    before = args.get("cursor", type=int)
+    if before is not None:
+        query = query.filter(Review.id < before)
+    rows = query.order_by(Review.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "reviews": [review.to_dict() for review in rows],
+        "has_more": has_more,
+        "next_cursor": str(rows[-1].id) if has_more else None,
+    }
+
+
+def recompute_aggregates():
+    """Rebuild every product's review aggregates from the reviews table.
+
+    A repair tool: products without reviews get zero counts and their
+    base_rating back. Returns the number of products updated.
+    """
+    total = (
+        select(func.coalesce(func.sum(Review.rating), 0))
+        .where(Review.product_id == Product.id)
+        .scalar_subquery()
+    )
+    count = (
+        select(func.count(Review.id))
+        .where(Review.product_id == Product.id)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        update(Product)
+        .values(
+            rating_sum=total,
+            rating_count=count,
+            rating=case((count > 0, total * 1.0 / count), else_=Product.base_rating),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
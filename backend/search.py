@@ -0,0 +1,140 @@
+import re
+
+from sqlalchemy import text, func, literal_column, select
+from models import db, Product
+
+# ------------------------------
+# FULL-TEXT SEARCH INDEX
+# ------------------------------
+# products_fts is an SQLite FTS5 table holding one row per product (rowid =
+# products.id) with its name, description and category name. Triggers keep it
+# in sync with every write to products/categories, including bulk statements
+# that bypass the ORM. Other databases fall back to ILIKE matching.
+FTS_TABLE = "products_fts"
+
+FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products
+    BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, description, category)
+        VALUES (new.id, new.name, new.description,
+                (SELECT name FROM categories WHERE id = new.category_id));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_update
+    AFTER UPDATE OF name, description, category_id ON products
+    BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, name, description, category)
+        VALUES (new.id, new.name, new.description,
+                (SELECT name FROM categories WHERE id = new.category_id));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products
+    BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS categories_fts_update
+    AFTER UPDATE OF name ON categories
+    BEGIN
+        UPDATE {FTS_TABLE} SET category = new.name
+        WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id);
+    END
+    """,
+]
+
+BACKFILL_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, name, description, category)
+    SELECT p.id, p.name, p.description, c.name
+    FROM products p LEFT JOIN categories c ON c.id = p.category_id
+"""
+
+# Engine URL -> whether the FTS table exists, so the check runs once per process
+_index_ready = {}
+
+
+def ensure_search_index(rebuild=False):
+    """Create the FTS table and its triggers, backfilling it when new.
+
+    Safe to call on every startup. ``rebuild=True`` repopulates the index from
+    scratch, e.g. after a reseed. Does nothing on non-SQLite databases.
+    """
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        existed = _table_exists(conn)
+        for statement in FTS_DDL:
+            conn.execute(text(statement))
+        if rebuild or not existed:
+            conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+            conn.execute(text(BACKFILL_SQL))
+    _index_ready[str(engine.url)] = True
+
+
+def _table_exists(conn):
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first() is not None
+
+
+def search_index_ready():
+    engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return False
+    key = str(engine.url)
+    if key not in _index_ready:
+        with engine.connect() as conn:
+            _index_ready[key] = _table_exists(conn)
+    return _index_ready[key]
+
+
+# ------------------------------
+# QUERYING
+# ------------------------------
+def match_expression(term):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    tokens = re.findall(r"\w+", term.lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def apply_search(query, term):
+    """Restrict a Product query to matches for ``term``.
+
+    Returns ``(query, rank)``. With the FTS index, ``rank`` is the bm25 score
+    of each match (lower is more relevant) and can be used for ordering;
+    otherwise it is None and matching falls back to a name ILIKE.
+    """
+    if not search_index_ready():
+        return query.filter(Product.name.ilike(f"%{term}%")), None
+
+    expression = match_expression(term)
+    if expression is None:
+        return query, None
+
+    fts = literal_column(FTS_TABLE)
+    matches = (
+        select(
+            literal_column("rowid").label("product_id"),
+            func.bm25(fts).label("rank"),
+        )
+        .select_from(text(FTS_TABLE))
+        .where(fts.op("MATCH")(expression))
+        .subquery()
+    )
+    query = query.join(matches, matches.c.product_id == Product.id)
+    return query, matches.c.rank
@@ -1,5 +1,8 @@
-from app import app
-from models import db, Category, Product, User, CartItem
+from app import create_app
+from models import db, Product, User, CartItem
+from bulk import import_products
+from search import ensure_search_index
+from related import ensure_related_index
 from werkzeug.security import generate_password_hash
 
 # -----------------------------
@@ -59,36 +62,18 @@ products = [
 # -----------------------------
 # SEED SCRIPT
 # -----------------------------
+# The tables are recreated below, so the startup schema checks are skipped
+app = create_app({"SCHEMA_CHECKS": False})
+
 with app.app_context():
     print("🔄 Resetting database...")
     db.drop_all()
     db.create_all()
+    ensure_search_index(rebuild=True)
+    ensure_related_index()
 
-    # Add categories dynamically
-    categories = {}
-    for p in products:
-        cat_name = p["category"]
-        if cat_name not in categories:
-            cat = Category(name=cat_name)
-            db.session.add(cat)
-            db.session.flush()
-            categories[cat_name] = cat
-
-    db.session.commit()
-
-    # Add products
-    for item in products:
-        p = Product(
-            name=item["name"],
-            description=item["description"],
-            price=item["price"],
-            stock=item["stock"],
-            image_url=item["image_url"],
-            rating=4.8,
-            category_id=categories[item["category"]].id,
-        )
-        db.session.add(p)
-    db.session.commit()
+    # Add products (categories are created as they are referenced)
+    import_products({**item, "rating": 4.8} for item in products)
 
     # Add demo user
     demo_user = User(
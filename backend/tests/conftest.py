@@ -0,0 +1,82 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+# The backend modules are imported flat (`from models import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models import db, Category, Product, CartItem, User  # noqa: E402
+
+PRODUCTS = 60
+CATEGORIES = 3
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """An app on a fresh SQLite file holding a small catalog and two carts.
+
+    The response cache is off so every request reaches the database, and
+    the related-products refresher is off so no background thread adds to
+    the counted statements.
+    """
+    path = tmp_path_factory.mktemp("db") / "quickcart.db"
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+        "CACHE_MAX_ENTRIES": 0,
+        "RELATED_REFRESH_SECONDS": 0,
+        "TESTING": True,
+    })
+    with app.app_context():
+        categories = [Category(name=f"Category {i}") for i in range(CATEGORIES)]
+        db.session.add_all(categories)
+        db.session.flush()
+        db.session.add_all(
+            Product(name=f"Product {i}", price=10.0 + i, stock=5, rating=4.0,
+                    base_rating=4.0, category_id=categories[i % CATEGORIES].id)
+            for i in range(PRODUCTS)
+        )
+        db.session.add_all(
+            User(name=f"User {i}", email=f"user{i}@example.com", password_hash="!")
+            for i in (1, 2)
+        )
+        db.session.flush()
+        # User 1 has one item in the cart, user 2 has ten
+        db.session.add(CartItem(user_id=1, product_id=1, quantity=1))
+        db.session.add_all(
+            CartItem(user_id=2, product_id=pid, quantity=2) for pid in range(1, 11)
+        )
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Return a function that runs a request and counts its SQL statements."""
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    def count(send):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = send()
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", record)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return len(statements)
+
+    return count
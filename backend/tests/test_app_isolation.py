@@ -0,0 +1,26 @@
+"""Apps built in one process keep their own caches and indexes."""
+from app import create_app
+from models import db, Category, Product
+
+
+def make_app(path, name):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "TESTING": True})
+    with app.app_context():
+        category = Category(name=f"{name} category")
+        db.session.add(category)
+        db.session.flush()
+        db.session.add(Product(name=f"{name} widget", price=1.0, stock=1,
+                               category_id=category.id))
+        db.session.commit()
+    return app.test_client()
+
+
+def test_apps_do_not_share_extension_state(tmp_path):
+    first = make_app(tmp_path / "first.db", "First")
+    second = make_app(tmp_path / "second.db", "Second")
+
+    assert first.get("/api/categories").get_json()[0]["name"] == "First category"
+    assert second.get("/api/categories").get_json()[0]["name"] == "Second category"
+
+    [product] = second.get("/api/autocomplete?q=widget").get_json()["products"]
+    assert product["name"] == "Second widget"
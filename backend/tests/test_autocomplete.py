@@ -0,0 +1,12 @@
+NAME = "Apple MacBook Pro Sixteen Inch Space Black Edition"
+
+
+def test_suggestions_match_past_the_stored_term_length(client):
+    created = client.post("/api/products", json={"name": NAME, "price": 2499.0, "stock": 3})
+    assert created.status_code == 201
+
+    for query in ("apple macbook pro sixteen inch space bl",
+                  "apple macbook pro sixteen inch space black",
+                  "apple macbook pro sixteen inch space black edition"):
+        products = client.get("/api/autocomplete", query_string={"q": query}).get_json()["products"]
+        assert [p["name"] for p in products] == [NAME], query
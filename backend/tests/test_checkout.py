@@ -0,0 +1,88 @@
+"""Concurrent checkouts never oversell a product or lose a cart change."""
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event, func
+
+from models import db, CartItem, OrderItem, Product, User
+
+BUYERS = 6
+STOCK = 15
+
+
+def add_buyers(app, stock, count):
+    """Create a product with ``stock`` units and ``count`` users to buy it."""
+    tag = time.time_ns()
+    with app.app_context():
+        product = Product(name=f"Race SKU {tag}", price=1.0, stock=stock)
+        users = [
+            User(name=f"Buyer {i}", email=f"buyer-{tag}-{i}@example.com", password_hash="!")
+            for i in range(count)
+        ]
+        db.session.add(product)
+        db.session.add_all(users)
+        db.session.commit()
+        return product.id, [u.id for u in users]
+
+
+def test_concurrent_checkouts_never_oversell(app):
+    product_id, user_ids = add_buyers(app, STOCK, BUYERS)
+
+    def buyer(user_id):
+        client = app.test_client()
+        statuses = []
+        # Bounded so a checkout that stays busy fails the test instead of hanging
+        for _ in range(STOCK * 2):
+            client.post("/api/cart", json={
+                "user_id": user_id, "product_id": product_id, "quantity": 2,
+            })
+            statuses.append(client.post("/api/checkout", json={"user_id": user_id}).status_code)
+            if statuses[-1] == 409:
+                break
+        return statuses
+
+    with ThreadPoolExecutor(max_workers=BUYERS) as pool:
+        statuses = [s for run in pool.map(buyer, user_ids) for s in run]
+
+    assert set(statuses) <= {201, 409, 503}
+    assert statuses.count(409) == BUYERS
+    with app.app_context():
+        remaining = db.session.get(Product, product_id).stock
+        sold = db.session.query(
+            func.coalesce(func.sum(OrderItem.quantity), 0)
+        ).filter(OrderItem.product_id == product_id).scalar()
+    assert remaining >= 0
+    assert sold + remaining == STOCK
+    assert sold == 2 * statuses.count(201)
+
+
+def test_checkout_orders_a_quantity_changed_while_it_runs(app, client):
+    product_id, [user_id] = add_buyers(app, 10, 1)
+    client.post("/api/cart", json={"user_id": user_id, "product_id": product_id, "quantity": 2})
+
+    with app.app_context():
+        engine = db.engine
+    bumped = []
+
+    def bump(conn, cursor, statement, parameters, context, executemany):
+        # Another request raises the quantity right after checkout read the cart
+        if not bumped and statement.lstrip().startswith("SELECT cart_items.id"):
+            bumped.append(True)
+            other = sqlite3.connect(engine.url.database)
+            other.execute("UPDATE cart_items SET quantity = 5 WHERE user_id = ?", (user_id,))
+            other.commit()
+            other.close()
+
+    event.listen(engine, "after_cursor_execute", bump)
+    try:
+        response = client.post("/api/checkout", json={"user_id": user_id})
+    finally:
+        event.remove(engine, "after_cursor_execute", bump)
+
+    assert bumped
+    assert response.status_code == 201
+    assert [item["quantity"] for item in response.get_json()["items"]] == [5]
+    with app.app_context():
+        assert db.session.query(CartItem).filter_by(user_id=user_id).count() == 0
+        assert db.session.get(Product, product_id).stock == 5
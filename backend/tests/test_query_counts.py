@@ -0,0 +1,47 @@
+"""Each endpoint runs a fixed number of SQL statements, however many rows it
+serializes, so a lazy load that turns into an N+1 query fails here."""
+from models import db, RelatedStale
+from related import refresh_stale
+
+
+def test_product_listing_query_count_independent_of_page_size(client, count_queries):
+    one = count_queries(lambda: client.get("/api/products?limit=1"))
+    fifty = count_queries(lambda: client.get("/api/products?limit=50"))
+    assert one == fifty
+
+
+def test_cursor_listing_query_count_independent_of_page_size(client, count_queries):
+    one = count_queries(lambda: client.get("/api/products?limit=1&cursor="))
+    fifty = count_queries(lambda: client.get("/api/products?limit=50&cursor="))
+    assert one == fifty
+
+
+def test_cart_query_count_independent_of_item_count(client, count_queries):
+    single = count_queries(lambda: client.get("/api/cart?user_id=1"))
+    ten = count_queries(lambda: client.get("/api/cart?user_id=2"))
+    assert single == ten == 1
+
+
+def test_product_detail_query_count(client, count_queries):
+    first = count_queries(lambda: client.get("/api/products/1"))
+    other = count_queries(lambda: client.get("/api/products/42"))
+    assert first == other == 1
+
+
+def test_sparse_listing_query_count_independent_of_page_size(client, count_queries):
+    fields = "name,price,category"
+    one = count_queries(lambda: client.get(f"/api/products?limit=1&fields={fields}"))
+    fifty = count_queries(lambda: client.get(f"/api/products?limit=50&fields={fields}"))
+    assert one == fifty
+
+
+def test_related_read_serves_stale_rows_without_writing(app, client, count_queries):
+    with app.app_context():
+        refresh_stale()
+    assert client.put("/api/products/2", json={"price": 12.5}).status_code == 200
+    with app.app_context():
+        assert db.session.get(RelatedStale, 1) is not None
+
+    assert count_queries(lambda: client.get("/api/products/1/related")) == 1
+    with app.app_context():
+        assert db.session.get(RelatedStale, 1) is not None
@@ -0,0 +1,113 @@
+"""Every listing filter x sort, and the cart, order and review queries, must
+be served by an index: no full scans, and no temp sorts where an index could
+have given the order. ``benchmark.py check-plans`` runs the same checks
+against a large generated catalog."""
+from urllib.parse import urlencode
+
+from flask import request
+from sqlalchemy.orm import Query
+
+from models import db, Category, Product, CartItem, Order, OrderItem, Review
+from catalog import read_filters, build_product_query, sort_key, apply_sort, _seek
+
+# Listing filter x sort combinations that an index must serve in order.
+# Cases marked ``sort_allowed`` filter on a range of one column while sorting
+# by another (or rank by relevance), which no single index can serve, so a
+# temp B-tree sort over the matching rows is expected there.
+PLAN_SORTS = ("name", "price-low", "price-high", "rating")
+PLAN_FILTERS = (
+    ({}, ()),
+    ({"category": "{category}"}, ()),
+    ({"minPrice": 10, "maxPrice": 50}, ("name", "rating")),
+    ({"minRating": 4}, ()),
+    ({"category": "{category}", "minPrice": 10}, ("name", "rating")),
+)
+PLAN_TABLES = ("products", "cart_items", "orders", "order_items", "reviews")
+
+
+def plan_problems(plan, sort_allowed=False):
+    """Return the full scans and temp sorts in an EXPLAIN QUERY PLAN."""
+    problems = []
+    for detail in plan:
+        words = detail.split()
+        if (len(words) >= 2 and words[0] == "SCAN" and words[1] in PLAN_TABLES
+                and "USING" not in words):
+            problems.append(detail)
+        if "TEMP B-TREE FOR ORDER BY" in detail and not sort_allowed:
+            problems.append(detail)
+    return problems
+
+
+def plan_statements(app):
+    """Return (label, sort_allowed, query) for every checked query."""
+    with app.app_context():
+        names = [row[0] for row in db.session.query(Category.name)]
+    # A category name that matches exactly one category, as the Shop sends
+    category = next((
+        name for name in names
+        if sum(name.lower() in other.lower() for other in names) == 1
+    ), None)
+    if category is None:
+        raise ValueError("The database has no categories")
+
+    cases = []
+    for filters, unordered in PLAN_FILTERS:
+        filters = {k: v.format(category=category) if isinstance(v, str) else v
+                   for k, v in filters.items()}
+        for sort_by in PLAN_SORTS:
+            cases.append(({**filters, "sortBy": sort_by}, sort_by in unordered))
+    cases.append(({"search": "apple"}, True))
+    cases.append(({"search": "apple", "sortBy": "price-low"}, True))
+
+    statements = []
+    for params, sort_allowed in cases:
+        with app.test_request_context("/api/products?" + urlencode(params)):
+            filters = read_filters(request.args)
+            query, rank = build_product_query(filters)
+            column, direction = sort_key(filters["sort_by"], rank)
+            label = urlencode(params)
+            statements.append((label, sort_allowed,
+                               apply_sort(query, column, direction).limit(12)))
+            statements.append((label + " (cursor)", sort_allowed, apply_sort(
+                _seek(query, column, direction, 1, 1), column, direction
+            ).limit(12)))
+
+    statements += [
+        ("featured products", False, Query(Product).filter(Product.featured == True)),
+        ("cart by user", False, Query(CartItem).join(CartItem.product)
+         .filter(CartItem.user_id == 1).order_by(CartItem.id)),
+        ("checkout lines", False, Query(CartItem)
+         .filter(CartItem.user_id == 1).order_by(CartItem.product_id)),
+        ("orders by user", False, Query(Order)
+         .filter(Order.user_id == 1).order_by(Order.id.desc())),
+        ("order items", False, Query(OrderItem).filter(OrderItem.order_id == 1)),
+        ("reviews by product", False, Query(Review)
+         .filter(Review.product_id == 1, Review.id < 100).order_by(Review.id.desc())),
+    ]
+    return statements
+
+
+def query_plans(app):
+    """Yield (label, problems) for every checked query; SQLite only."""
+    statements = plan_statements(app)
+    with app.app_context():
+        dialect = db.engine.dialect
+        with db.engine.connect() as conn:
+            for label, sort_allowed, query in statements:
+                sql = str(query.statement.compile(
+                    dialect=dialect, compile_kwargs={"literal_binds": True}
+                ))
+                plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+                yield label, plan_problems(plan, sort_allowed)
+
+
+def test_plan_problems_flags_scans_and_temp_sorts():
+    assert plan_problems(["SCAN products"]) == ["SCAN products"]
+    assert plan_problems(["SCAN products USING INDEX ix_products_price"]) == []
+    assert plan_problems(["USE TEMP B-TREE FOR ORDER BY"]) == ["USE TEMP B-TREE FOR ORDER BY"]
+    assert plan_problems(["USE TEMP B-TREE FOR ORDER BY"], sort_allowed=True) == []
+
+
+def test_queries_are_served_by_indexes(app):
+    failures = {label: problems for label, problems in query_plans(app) if problems}
+    assert failures == {}
@@ -18,20 +18,27 @@ const Home = () => {
     setLoading(true);
 
     try {
-      // Fetch featured products and categories simultaneously
-      const [productsRes, categoriesRes] = await Promise.all([
-        fetch(`${API_BASE}/products`),
-        fetch(`${API_BASE}/categories`),
-      ]);
-
-      const productsData = await productsRes.json();
-      const categoriesData = await categoriesRes.json();
+      // Fetch featured products and categories in one batched request
+      const res = await fetch(`${API_BASE}/batch`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          requests: [
+            {
+              type: "featured",
+              params: { fields: "name,description,price,stock,image_url" },
+            },
+            { type: "categories" },
+          ],
+        }),
+      });
+      const { results } = await res.json();
 
       // Show only 8 featured items (you can change logic as needed)
-      const featured = productsData.filter((p) => p.featured).slice(0, 8);
+      const featured = (results.featured.body || []).slice(0, 8);
 
       setFeaturedProducts(featured);
-      setCategories(categoriesData);
+      setCategories(results.categories.body || []);
     } catch (error) {
       console.error("Error fetching data:", error);
     }
@@ -21,7 +21,9 @@ const Shop = () => {
   });
   const [page, setPage] = useState(1);
   const [hasMore, setHasMore] = useState(true);
+  const [nextCursor, setNextCursor] = useState('');
   const [loading, setLoading] = useState(true);
+  const [suggestions, setSuggestions] = useState([]);
 
   const { addToCart } = useCart();
   const [cartMessage, setCartMessage] = useState('');
@@ -34,6 +36,26 @@ const Shop = () => {
       .catch((err) => console.error('Failed to fetch categories:', err));
   }, []);
 
+  // Suggest product and category names as the user types
+  useEffect(() => {
+    if (!filters.search) {
+      setSuggestions([]);
+      return;
+    }
+    const timer = setTimeout(() => {
+      fetch(`${API_BASE}/autocomplete?q=${encodeURIComponent(filters.search)}`)
+        .then((res) => res.json())
+        .then((data) =>
+          setSuggestions([
+            ...data.products.map((p) => p.name),
+            ...data.categories.map((c) => c.name),
+          ])
+        )
+        .catch(() => setSuggestions([]));
+    }, 100);
+    return () => clearTimeout(timer);
+  }, [filters.search]);
+
   // Fetch products when filters or page changes
   useEffect(() => {
     fetchProducts();
@@ -46,7 +68,8 @@ const Shop = () => {
     Object.keys(filters).forEach((key) => {
       if (filters[key]) params.append(key, filters[key]);
     });
-    params.append('page', page);
+    // Keyset pagination: an empty cursor asks for the first page
+    params.append('cursor', page === 1 ? '' : nextCursor);
     params.append('limit', 12);
 
     try {
@@ -64,6 +87,7 @@ const Shop = () => {
       }
 
       setHasMore(data.has_more ?? false);
+      setNextCursor(data.next_cursor || '');
     } catch (err) {
       console.error('Error fetching products:', err);
     }
@@ -114,8 +138,14 @@ const Shop = () => {
             placeholder="Search products..."
             value={filters.search}
             onChange={(e) => handleFilterChange('search', e.target.value)}
+            list="search-suggestions"
             style={{ padding: '0.5rem 1rem', borderRadius: '6px', border: '1px solid #cbd5e0', minWidth: '200px', fontSize: '1rem' }}
           />
+          <datalist id="search-suggestions">
+            {[...new Set(suggestions)].map((name) => (
+              <option key={name} value={name} />
+            ))}
+          </datalist>
 
           <select
             value={filters.category}
@@ -163,6 +193,7 @@ const Shop = () => {
             style={{ padding: '0.5rem 1rem', borderRadius: '6px', border: '1px solid #cbd5e0', fontSize: '1rem' }}
           >
             <option value="name">Name</option>
+            <option value="relevance">Relevance</option>
             <option value="price-low">Price: Low to High</option>
             <option value="price-high">Price: High to Low</option>
             <option value="rating">Rating</option>